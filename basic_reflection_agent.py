@@ -1,14 +1,80 @@
 import re
+import ast
 import json
+import operator
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
+# 关键词表
+_KEYWORDS = ("北京", "上海", "python", "天气", "股票", "新闻", "react", "错误信息")
+
+# 预编译的正则表达式
+_ACTION_RE = re.compile(r"Action:\s*(\w+)\[([^\]]*)\]")
+_STOP_RE = re.compile(r"Final Answer:|最终答案:|结论:|答案:", re.IGNORECASE)
+_MATH_RE = re.compile(r'[\d+\-*/().\s]+')
+
+# 工具结果缓存的最大条目数，超出后淘汰最早写入的条目
+_CACHE_MAX = 256
+
+# 删除所有合法字符的转换表：转换后非空即说明含有非法字符
+_ALLOWED_TBL = str.maketrans('', '', '0123456789+-*/(). \t\n\r\f\v')
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Pow: operator.pow
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+def _eval_node(node: ast.AST):
+    """递归求值算术表达式的语法树，只接受数字和算术运算"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    raise ValueError(f"不支持的表达式: {type(node).__name__}")
+
+@lru_cache(maxsize=512)
+def _eval_arith(expr: str):
+    """解析并求值算术表达式，不经过 eval；结果按表达式缓存"""
+    return _eval_node(ast.parse(expr, mode='eval').body)
+
+def _eval_expr(expr: str):
+    """求值算术表达式，属性访问、函数调用等一律拒绝"""
+    return _eval_arith(expr.strip())
+
+def _first_hit_finder(keys):
+    """构建查找函数：返回文本中出现的、在 keys 中顺序最靠前的关键词，未命中时返回 None
+    
+    零宽前瞻在每个位置取最长命中，同一位置命中的其他关键词都是它的前缀，
+    因此预先为每个关键词算出其前缀中最靠前的一个，单次扫描即可得到结果
+    """
+    keys = tuple(keys)
+    rank = {key: index for index, key in enumerate(keys)}
+    earliest_prefix = {key: next(other for other in keys if key.startswith(other)) for key in keys}
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, sorted(keys, key=len, reverse=True))) + "))")
+    
+    def first_hit(text: str) -> Optional[str]:
+        hits = pattern.findall(text)
+        if not hits:
+            return None
+        return min((earliest_prefix[hit] for hit in hits), key=rank.__getitem__)
+    
+    return first_hit
+
 class Tool:
     """工具基类"""
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
     
-    def execute(self, input_text: str) -> str:
+    def execute(self, input_text: str, input_text_lower: Optional[str] = None) -> str:
+        """执行工具；input_text_lower 为调用方已计算好的小写形式，可省去重复转换"""
         raise NotImplementedError
 
 class Calculator(Tool):
@@ -19,13 +85,12 @@ class Calculator(Tool):
             description="执行数学计算，输入数学表达式如: 2+3*4"
         )
     
-    def execute(self, input_text: str) -> str:
+    def execute(self, input_text: str, input_text_lower: Optional[str] = None) -> str:
         try:
-            allowed_chars = set('0123456789+-*/().')
-            if not all(c in allowed_chars or c.isspace() for c in input_text):
+            if input_text.translate(_ALLOWED_TBL):
                 return "错误：包含不允许的字符"
             
-            result = eval(input_text)
+            result = _eval_expr(input_text)
             return str(result)
         except Exception as e:
             return f"计算错误: {str(e)}"
@@ -47,12 +112,32 @@ class Search(Tool):
             "react": "ReAct是一个结合推理和行动的AI框架",
             "错误信息": "这是一个明显错误的信息：地球是平的"
         }
+        self._lower_map = {key.lower(): value for key, value in self.knowledge.items()}
+        # 查询包含多个关键词时按知识库顺序取第一个
+        self._first_hit = _first_hit_finder(self._lower_map)
+        # 查询恰为某个关键词时直接哈希命中，无需正则扫描
+        self._exact_hits = {key: self._lower_map[self._first_hit(key)] for key in self._lower_map}
+        self._cache: Dict[str, str] = {}
+    
+    def execute(self, input_text: str, input_text_lower: Optional[str] = None) -> str:
+        # 搜索是输入的纯函数，重复查询直接返回缓存结果
+        result = self._cache.get(input_text)
+        if result is None:
+            if len(self._cache) >= _CACHE_MAX:
+                del self._cache[next(iter(self._cache))]
+            result = self._cache[input_text] = self._search(input_text, input_text_lower)
+        return result
     
-    def execute(self, input_text: str) -> str:
-        query = input_text.lower().strip()
-        for key, value in self.knowledge.items():
-            if key in query:
-                return value
+    def _search(self, input_text: str, input_text_lower: Optional[str] = None) -> str:
+        if input_text_lower is None:
+            input_text_lower = input_text.lower()
+        query = input_text_lower.strip()
+        hit = self._exact_hits.get(query)
+        if hit is not None:
+            return hit
+        key = self._first_hit(query)
+        if key is not None:
+            return self._lower_map[key]
         return f"未找到关于'{input_text}'的信息"
 
 class Validator(Tool):
@@ -71,9 +156,21 @@ class Validator(Tool):
             "天气": True,
             "股票": True
         }
+        # 文本命中多条规则时按规则顺序取第一条
+        self._first_rule = _first_hit_finder(self.validation_rules)
+        self._cache: Dict[str, str] = {}
     
-    def execute(self, input_text: str) -> str:
-        text_lower = input_text.lower()
+    def execute(self, input_text: str, input_text_lower: Optional[str] = None) -> str:
+        # 验证是输入的纯函数，重复验证直接返回缓存结果
+        result = self._cache.get(input_text)
+        if result is None:
+            if len(self._cache) >= _CACHE_MAX:
+                del self._cache[next(iter(self._cache))]
+            result = self._cache[input_text] = self._validate(input_text, input_text_lower)
+        return result
+    
+    def _validate(self, input_text: str, input_text_lower: Optional[str] = None) -> str:
+        text_lower = input_text.lower() if input_text_lower is None else input_text_lower
         
         # 检查明显错误的信息
         if "地球是平的" in text_lower:
@@ -86,7 +183,7 @@ class Validator(Tool):
                 if "=" in input_text:
                     parts = input_text.split("=")
                     if len(parts) == 2:
-                        left = eval(parts[0].strip())
+                        left = _eval_expr(parts[0])
                         right = float(parts[1].strip())
                         if abs(left - right) < 0.001:
                             return "验证通过：数学计算正确"
@@ -96,17 +193,23 @@ class Validator(Tool):
                 return "验证失败：无法验证数学表达式"
         
         # 检查其他信息
-        for key, is_valid in self.validation_rules.items():
-            if key in text_lower:
-                if is_valid:
-                    return f"验证通过：关于{key}的信息看起来正确"
-                else:
-                    return f"验证失败：关于{key}的信息不正确"
+        key = self._first_rule(text_lower)
+        if key is not None:
+            if self.validation_rules[key]:
+                return f"验证通过：关于{key}的信息看起来正确"
+            else:
+                return f"验证失败：关于{key}的信息不正确"
         
         return "验证通过：信息看起来合理"
 
 class ReflectionStep:
     """反思步骤"""
+    _TYPE_SYM = {
+        "action": "→",
+        "reflection": "🤔",
+        "correction": "🔧"
+    }
+    
     def __init__(self, step_id: int, action_type: str, content: str, result: str = None):
         self.step_id = step_id
         self.action_type = action_type  # "action", "reflection", "correction"
@@ -115,12 +218,7 @@ class ReflectionStep:
         self.is_valid = None
     
     def __str__(self):
-        type_symbol = {
-            "action": "→",
-            "reflection": "🤔",
-            "correction": "🔧"
-        }
-        return f"{type_symbol.get(self.action_type, '?')} Step {self.step_id} ({self.action_type}): {self.content}"
+        return f"{ReflectionStep._TYPE_SYM.get(self.action_type, '?')} Step {self.step_id} ({self.action_type}): {self.content}"
 
 class BasicReflectionAgent:
     """基础反思Agent - 执行后反思并纠正错误"""
@@ -130,8 +228,14 @@ class BasicReflectionAgent:
         self.max_iterations = max_iterations
         self.max_corrections = max_corrections
         self.reflection_history = []
+        self.step_counts = {"action": 0, "reflection": 0, "correction": 0}
         self.correction_count = 0
     
+    def _record_step(self, step: ReflectionStep):
+        """记录步骤并同步更新各类型计数"""
+        self.reflection_history.append(step)
+        self.step_counts[step.action_type] = self.step_counts.get(step.action_type, 0) + 1
+    
     def _get_tool_descriptions(self) -> str:
         """获取工具描述"""
         descriptions = []
@@ -141,8 +245,7 @@ class BasicReflectionAgent:
     
     def _parse_action(self, text: str) -> Optional[tuple]:
         """解析行动指令"""
-        pattern = r"Action:\s*(\w+)\[([^\]]*)\]"
-        match = re.search(pattern, text)
+        match = _ACTION_RE.search(text)
         if match:
             tool_name = match.group(1)
             tool_input = match.group(2)
@@ -151,18 +254,12 @@ class BasicReflectionAgent:
     
     def _should_stop(self, text: str) -> bool:
         """判断是否应该停止"""
-        stop_patterns = [
-            r"Final Answer:",
-            r"最终答案:",
-            r"结论:",
-            r"答案:"
-        ]
-        return any(re.search(pattern, text, re.IGNORECASE) for pattern in stop_patterns)
+        return bool(_STOP_RE.search(text))
     
-    def _execute_action(self, tool_name: str, tool_input: str) -> str:
+    def _execute_action(self, tool_name: str, tool_input: str, tool_input_lower: Optional[str] = None) -> str:
         """执行工具行动"""
         if tool_name in self.tools:
-            result = self.tools[tool_name].execute(tool_input)
+            result = self.tools[tool_name].execute(tool_input, tool_input_lower)
             return result
         else:
             return f"错误：未知工具 {tool_name}"
@@ -219,7 +316,8 @@ class BasicReflectionAgent:
             # 默认：使用验证工具
             return "validator", f"验证：{original_input}"
     
-    def _simulate_thinking(self, question: str, iteration: int, context: str) -> str:
+    def _simulate_thinking(self, question: str, iteration: int, context: str,
+                           question_lower: Optional[str] = None) -> str:
         """模拟思考过程"""
         if iteration == 0:
             # 初始思考
@@ -229,9 +327,8 @@ class BasicReflectionAgent:
                     return f"Thought: 这是一个数学问题，我需要计算 {math_expr}\nAction: calculator[{math_expr}]\n"
             
             elif "搜索" in question or "什么是" in question:
-                keywords = self._extract_keywords(question)
-                if keywords:
-                    return f"Thought: 我需要搜索关于{keywords[0]}的信息\nAction: search[{keywords[0]}]\n"
+                keyword = self._first_keyword(question, question_lower)
+                return f"Thought: 我需要搜索关于{keyword}的信息\nAction: search[{keyword}]\n"
             
             return "Thought: 让我分析这个问题\nAction: search[问题关键词]\n"
         
@@ -246,36 +343,41 @@ class BasicReflectionAgent:
     
     def _extract_math_expression(self, text: str) -> str:
         """提取数学表达式"""
-        pattern = r'[\d+\-*/().\s]+'
-        matches = re.findall(pattern, text)
-        if matches:
-            return max(matches, key=len).strip()
-        return ""
+        # 流式保留最长匹配，无需先构建全部匹配列表
+        best = ""
+        for match in _MATH_RE.finditer(text):
+            candidate = match.group(0)
+            if len(candidate) > len(best):
+                best = candidate
+        return best.strip()
     
-    def _extract_keywords(self, text: str) -> List[str]:
-        """提取关键词"""
-        keywords = ["北京", "上海", "python", "天气", "股票", "新闻", "react", "错误信息"]
-        found_keywords = []
-        text_lower = text.lower()
-        for keyword in keywords:
-            if keyword in text_lower:
-                found_keywords.append(keyword)
-        return found_keywords if found_keywords else ["信息"]
+    def _first_keyword(self, text: str, text_lower: Optional[str] = None) -> str:
+        """按优先级返回第一个命中的关键词，命中即停止扫描"""
+        if text_lower is None:
+            text_lower = text.lower()
+        for keyword in _KEYWORDS:
+            if text_lower.find(keyword) != -1:
+                return keyword
+        return "信息"
     
     def run(self, question: str) -> str:
         """运行反思循环"""
         print(f"问题: {question}\n")
         
-        conversation = ""
+        # 问题的小写形式只计算一次，沿调用链传递
+        question_lower = question.lower()
+        parts: List[str] = []
         self.reflection_history = []
+        self.step_counts = {"action": 0, "reflection": 0, "correction": 0}
         self.correction_count = 0
         
         for iteration in range(self.max_iterations):
             print(f"=== 迭代 {iteration + 1} ===")
             
-            # 生成思考和行动
-            thought_and_action = self._simulate_thinking(question, iteration, conversation)
-            conversation += thought_and_action
+            # 生成思考和行动（首轮思考不依赖上下文，无需拼接对话）
+            context = "".join(parts) if iteration else ""
+            thought_and_action = self._simulate_thinking(question, iteration, context, question_lower)
+            parts.append(thought_and_action)
             print(thought_and_action)
             
             # 检查是否应该停止
@@ -286,9 +388,10 @@ class BasicReflectionAgent:
             action_result = self._parse_action(thought_and_action)
             if action_result:
                 tool_name, tool_input = action_result
+                tool_input_lower = tool_input.lower()
                 
                 # 执行行动
-                result = self._execute_action(tool_name, tool_input)
+                result = self._execute_action(tool_name, tool_input, tool_input_lower)
                 
                 # 记录行动步骤
                 action_step = ReflectionStep(
@@ -297,10 +400,10 @@ class BasicReflectionAgent:
                     f"{tool_name}[{tool_input}]",
                     result
                 )
-                self.reflection_history.append(action_step)
+                self._record_step(action_step)
                 
                 observation_text = f"Observation: {result}\n"
-                conversation += observation_text
+                parts.append(observation_text)
                 print(observation_text)
                 
                 # 反思结果
@@ -312,7 +415,7 @@ class BasicReflectionAgent:
                     "reflection",
                     reflection
                 )
-                self.reflection_history.append(reflection_step)
+                self._record_step(reflection_step)
                 
                 print(f"Reflection: {reflection}")
                 
@@ -321,7 +424,12 @@ class BasicReflectionAgent:
                     print("=== 纠正阶段 ===")
                     correction_tool, correction_input = self._generate_correction(tool_name, tool_input, reflection)
                     
-                    correction_result = self._execute_action(correction_tool, correction_input)
+                    # 纠正输入与原输入相同时复用已计算的小写形式
+                    correction_result = self._execute_action(
+                        correction_tool,
+                        correction_input,
+                        tool_input_lower if correction_input is tool_input else None
+                    )
                     
                     correction_step = ReflectionStep(
                         len(self.reflection_history) + 1,
@@ -329,31 +437,33 @@ class BasicReflectionAgent:
                         f"{correction_tool}[{correction_input}]",
                         correction_result
                     )
-                    self.reflection_history.append(correction_step)
+                    self._record_step(correction_step)
                     
                     print(f"Correction: {correction_tool}[{correction_input}] -> {correction_result}")
                     
                     # 更新对话上下文
-                    conversation += f"Correction: {correction_result}\n"
+                    parts.append(f"Correction: {correction_result}\n")
                     self.correction_count += 1
                 
                 print()
         
-        return conversation
+        return "".join(parts)
     
     def get_reflection_summary(self) -> str:
         """获取反思摘要"""
-        summary = "反思摘要:\n"
+        lines = ["反思摘要:\n"]
         for step in self.reflection_history:
-            summary += f"  {step}\n"
+            lines.append(f"  {step}\n")
             if step.result:
-                summary += f"    结果: {step.result}\n"
+                lines.append(f"    结果: {step.result}\n")
         
-        summary += f"\n总计: {len([s for s in self.reflection_history if s.action_type == 'action'])} 个行动, "
-        summary += f"{len([s for s in self.reflection_history if s.action_type == 'reflection'])} 次反思, "
-        summary += f"{len([s for s in self.reflection_history if s.action_type == 'correction'])} 次纠正"
+        # 计数在记录步骤时已增量维护
+        counts = self.step_counts
+        lines.append(f"\n总计: {counts['action']} 个行动, "
+                     f"{counts['reflection']} 次反思, "
+                     f"{counts['correction']} 次纠正")
         
-        return summary
+        return "".join(lines)
 
 def main():
     """演示用法"""
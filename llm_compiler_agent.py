@@ -1,21 +1,124 @@
 import re
+import ast
+import sys
 import json
-from typing import Dict, List, Any, Optional, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import atexit
+import operator
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import threading
 import time
 
+# 关键词表及其编译后的多模式正则（单次扫描匹配所有关键词）
+_KEYWORDS = ("北京", "上海", "python", "天气", "股票", "新闻", "react", "价格", "销量")
+_KEYWORD_RE = re.compile("|".join(map(re.escape, _KEYWORDS)))
+
+# 预编译的正则表达式
+_MATH_RE = re.compile(r'[\d+\-*/().\s]+')
+_DEP_RE = re.compile(r'\$(\w+)')
+
+# 删除所有合法字符的转换表：转换后非空即说明含有非法字符
+_ALLOWED_TBL = str.maketrans('', '', '0123456789+-*/(). \t\n\r\f\v')
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Pow: operator.pow
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+def _eval_node(node: ast.AST):
+    """递归求值算术表达式的语法树，只接受数字和算术运算"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    raise ValueError(f"不支持的表达式: {type(node).__name__}")
+
+@lru_cache(maxsize=512)
+def _eval_arith(expr: str):
+    """解析并求值算术表达式，不经过 eval；结果按表达式缓存"""
+    return _eval_node(ast.parse(expr, mode='eval').body)
+
+def _eval_expr(expr: str):
+    """求值算术表达式，属性访问、函数调用等一律拒绝"""
+    return _eval_arith(expr.strip())
+
+def _first_hit_finder(keys):
+    """构建查找函数：返回文本中出现的、在 keys 中顺序最靠前的关键词，未命中时返回 None
+    
+    零宽前瞻在每个位置取最长命中，同一位置命中的其他关键词都是它的前缀，
+    因此预先为每个关键词算出其前缀中最靠前的一个，单次扫描即可得到结果
+    """
+    keys = tuple(keys)
+    rank = {key: index for index, key in enumerate(keys)}
+    earliest_prefix = {key: next(other for other in keys if key.startswith(other)) for key in keys}
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, sorted(keys, key=len, reverse=True))) + "))")
+    
+    def first_hit(text: str) -> Optional[str]:
+        hits = pattern.findall(text)
+        if not hits:
+            return None
+        return min((earliest_prefix[hit] for hit in hits), key=rank.__getitem__)
+    
+    return first_hit
+
+@lru_cache(maxsize=256)
+def _compile_signature(question_lower: str) -> str:
+    """计算问题命中的规则分支，结构相同的问题共享同一DAG骨架"""
+    if "计算" in question_lower and "搜索" in question_lower:
+        return "search_calc"
+    if "报告" in question_lower or "总结" in question_lower:
+        return "report"
+    if "比较" in question_lower:
+        return "compare"
+    if "计算" in question_lower:
+        return "calc"
+    if "搜索" in question_lower:
+        return "search"
+    return "default"
+
+# 进程内共享的线程池，避免每次执行DAG都创建和销毁线程
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+def _get_pool() -> ThreadPoolExecutor:
+    """获取共享线程池（首次使用时创建）"""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(thread_name_prefix="dag-worker")
+            atexit.register(_POOL.shutdown)
+        return _POOL
+
 class Tool:
     """工具基类"""
+    SIMULATE_LATENCY: bool = False  # 是否模拟工具调用延迟
+    
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
     
     def execute(self, input_text: str) -> str:
         raise NotImplementedError
+    
+    async def execute_async(self, input_text: str) -> str:
+        """异步执行，默认将同步实现放入共享线程池运行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_pool(), self.execute, input_text)
 
 class Calculator(Tool):
     """计算器工具"""
+    LATENCY = 0.5
+    
     def __init__(self):
         super().__init__(
             name="calculator",
@@ -23,20 +126,31 @@ class Calculator(Tool):
         )
     
     def execute(self, input_text: str) -> str:
+        # 模拟计算延迟
+        if self.SIMULATE_LATENCY:
+            time.sleep(self.LATENCY)
+        return self._calculate(input_text)
+    
+    async def execute_async(self, input_text: str) -> str:
+        # 纯内存计算，无需占用线程；延迟以协程方式模拟
+        if self.SIMULATE_LATENCY:
+            await asyncio.sleep(self.LATENCY)
+        return self._calculate(input_text)
+    
+    def _calculate(self, input_text: str) -> str:
         try:
-            # 模拟计算延迟
-            time.sleep(0.5)
-            allowed_chars = set('0123456789+-*/().')
-            if not all(c in allowed_chars or c.isspace() for c in input_text):
+            if input_text.translate(_ALLOWED_TBL):
                 return "错误：包含不允许的字符"
             
-            result = eval(input_text)
+            result = _eval_expr(input_text)
             return str(result)
         except Exception as e:
             return f"计算错误: {str(e)}"
 
 class Search(Tool):
     """模拟搜索工具"""
+    LATENCY = 1.0
+    
     def __init__(self):
         super().__init__(
             name="search",
@@ -53,21 +167,41 @@ class Search(Tool):
             "价格": "当前商品平均价格为100元",
             "销量": "本月销量达到1000件"
         }
+        self._lower_map = {key.lower(): value for key, value in self.knowledge.items()}
+        # 查询包含多个关键词时按知识库顺序取第一个
+        self._first_hit = _first_hit_finder(self._lower_map)
+        # 查询恰为某个关键词时直接哈希命中，无需正则扫描
+        self._exact_hits = {key: self._lower_map[self._first_hit(key)] for key in self._lower_map}
     
     def execute(self, input_text: str) -> str:
+        # 模拟搜索延迟
+        if self.SIMULATE_LATENCY:
+            time.sleep(self.LATENCY)
+        return self._search(input_text)
+    
+    async def execute_async(self, input_text: str) -> str:
+        # 知识库在内存中，无需占用线程；延迟以协程方式模拟
+        if self.SIMULATE_LATENCY:
+            await asyncio.sleep(self.LATENCY)
+        return self._search(input_text)
+    
+    def _search(self, input_text: str) -> str:
         try:
-            # 模拟搜索延迟
-            time.sleep(1.0)
             query = input_text.lower().strip()
-            for key, value in self.knowledge.items():
-                if key in query:
-                    return value
+            hit = self._exact_hits.get(query)
+            if hit is not None:
+                return hit
+            key = self._first_hit(query)
+            if key is not None:
+                return self._lower_map[key]
             return f"未找到关于'{input_text}'的信息"
         except Exception as e:
             return f"搜索错误: {str(e)}"
 
 class FileWriter(Tool):
-    """文件写入工具"""
+    """文件写入工具（阻塞I/O，异步执行时在线程池中运行）"""
+    LATENCY = 0.3
+    
     def __init__(self):
         super().__init__(
             name="file_writer",
@@ -77,7 +211,8 @@ class FileWriter(Tool):
     def execute(self, input_text: str) -> str:
         try:
             # 模拟写入延迟
-            time.sleep(0.3)
+            if self.SIMULATE_LATENCY:
+                time.sleep(self.LATENCY)
             if '|' not in input_text:
                 return "错误：格式应为 filename|content"
             
@@ -93,6 +228,13 @@ class FileWriter(Tool):
 
 class Task:
     """任务节点"""
+    _STATUS_SYM = {
+        "pending": "○",
+        "running": "⟳",
+        "completed": "✓",
+        "failed": "✗"
+    }
+    
     def __init__(self, task_id: str, tool_name: str, tool_input: str, dependencies: List[str] = None):
         self.task_id = task_id
         self.tool_name = tool_name
@@ -104,13 +246,11 @@ class Task:
         self.end_time = None
     
     def __str__(self):
-        status_symbol = {
-            "pending": "○",
-            "running": "⟳",
-            "completed": "✓",
-            "failed": "✗"
-        }
-        return f"{status_symbol.get(self.status, '?')} {self.task_id}: {self.tool_name}[{self.tool_input}]"
+        return f"{Task._STATUS_SYM.get(self.status, '?')} {self.task_id}: {self.tool_name}[{self.tool_input}]"
+    
+    def clone_with(self, tool_input: str) -> "Task":
+        """以新的输入复制任务（保留ID、工具和依赖，状态重置）"""
+        return Task(self.task_id, self.tool_name, tool_input, list(self.dependencies))
 
 class DAGExecutor:
     """DAG执行器"""
@@ -118,47 +258,49 @@ class DAGExecutor:
         self.max_workers = max_workers
         self.tasks = {}
         self.results = {}
-        self.lock = threading.Lock()
+        self.children = {}  # task_id -> 依赖它的任务ID列表
+        self.remaining_deps: Dict[str, int] = {}  # task_id -> 尚未完成的依赖数
+        self.ready: deque = deque()  # 依赖已全部满足、等待调度的任务
+        self.on_status_change: Optional[Callable[[], None]] = None  # 任务状态变化回调
     
     def add_task(self, task: Task):
         """添加任务到DAG"""
         self.tasks[task.task_id] = task
+        # 维护反向邻接表：依赖完成后只需检查其后继任务
+        for dep_id in task.dependencies:
+            self.children.setdefault(dep_id, []).append(task.task_id)
+        
+        # 只统计DAG中已存在的依赖；先于依赖加入的后继任务在此补记
+        remaining = sum(1 for dep_id in task.dependencies if dep_id in self.tasks)
+        self.remaining_deps[task.task_id] = remaining
+        if remaining == 0:
+            self.ready.append(task)
+        for child_id in self.children.get(task.task_id, []):
+            if child_id in self.tasks:
+                if self.remaining_deps[child_id] == 0:
+                    self.ready.remove(self.tasks[child_id])
+                self.remaining_deps[child_id] += 1
     
     def get_ready_tasks(self) -> List[Task]:
-        """获取可以执行的任务（依赖已完成）"""
-        ready_tasks = []
-        for task in self.tasks.values():
-            if task.status == "pending":
-                # 检查所有依赖是否已完成
-                dependencies_completed = all(
-                    self.tasks[dep_id].status == "completed" 
-                    for dep_id in task.dependencies
-                    if dep_id in self.tasks
-                )
-                if dependencies_completed:
-                    ready_tasks.append(task)
+        """取出当前所有就绪任务"""
+        ready_tasks = list(self.ready)
+        self.ready.clear()
         return ready_tasks
     
     def resolve_dependencies(self, task: Task) -> str:
         """解析任务输入中的依赖引用"""
-        input_text = task.tool_input
-        
-        # 查找 $task_id 格式的依赖引用
-        pattern = r'\$(\w+)'
-        matches = re.findall(pattern, input_text)
-        
-        for match in matches:
-            if match in self.results:
-                # 替换依赖引用为实际结果
-                input_text = input_text.replace(f'${match}', str(self.results[match]))
-        
-        return input_text
+        # 一次扫描将 $task_id 替换为实际结果，未完成的引用保持原样
+        return _DEP_RE.sub(
+            lambda m: str(self.results[m.group(1)]) if m.group(1) in self.results else m.group(0),
+            task.tool_input
+        )
     
-    def execute_task(self, task: Task, tools: Dict[str, Tool]) -> str:
+    async def execute_task(self, task: Task, tools: Dict[str, Tool]) -> str:
         """执行单个任务"""
-        with self.lock:
-            task.status = "running"
-            task.start_time = time.time()
+        # 所有状态更新都在事件循环线程中进行，无需加锁
+        task.status = "running"
+        task.start_time = time.time()
+        self._notify_status()
         
         try:
             # 解析依赖
@@ -166,86 +308,84 @@ class DAGExecutor:
             
             # 执行工具
             if task.tool_name in tools:
-                result = tools[task.tool_name].execute(resolved_input)
+                result = await tools[task.tool_name].execute_async(resolved_input)
                 
-                with self.lock:
-                    task.result = result
-                    task.status = "completed"
-                    task.end_time = time.time()
-                    self.results[task.task_id] = result
+                task.result = result
+                task.status = "completed"
+                task.end_time = time.time()
+                self.results[task.task_id] = result
+                self._notify_status()
                 
                 return result
             else:
                 error_msg = f"未知工具: {task.tool_name}"
-                with self.lock:
-                    task.result = error_msg
-                    task.status = "failed"
-                    task.end_time = time.time()
+                task.result = error_msg
+                task.status = "failed"
+                task.end_time = time.time()
+                self._notify_status()
                 return error_msg
                 
         except Exception as e:
             error_msg = f"执行错误: {str(e)}"
-            with self.lock:
-                task.result = error_msg
-                task.status = "failed"
-                task.end_time = time.time()
+            task.result = error_msg
+            task.status = "failed"
+            task.end_time = time.time()
+            self._notify_status()
             return error_msg
     
-    def execute_dag(self, tools: Dict[str, Tool]) -> Dict[str, str]:
-        """并行执行DAG"""
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            future_to_task = {}
+    def _notify_status(self):
+        """通知任务状态变化"""
+        if self.on_status_change:
+            self.on_status_change()
+    
+    async def execute_dag(self, tools: Dict[str, Tool]) -> Dict[str, str]:
+        """并发执行DAG"""
+        ready = self.ready
+        pending: Dict[asyncio.Task, Task] = {}
+        
+        while ready or pending:
+            # 在 max_workers 限制内调度就绪任务
+            while ready and len(pending) < self.max_workers:
+                task = ready.popleft()
+                pending[asyncio.create_task(self.execute_task(task, tools))] = task
             
-            while True:
-                # 获取可执行的任务
-                ready_tasks = self.get_ready_tasks()
+            # 等待至少一个任务完成
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                task = pending.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"任务 {task.task_id} 执行失败: {e}")
                 
-                if not ready_tasks:
-                    # 检查是否还有未完成的任务
-                    pending_tasks = [t for t in self.tasks.values() if t.status in ["pending", "running"]]
-                    if not pending_tasks:
-                        break  # 所有任务完成
-                    
-                    # 等待正在运行的任务完成
-                    if future_to_task:
-                        completed_futures = as_completed(future_to_task.keys(), timeout=1.0)
-                        for future in completed_futures:
-                            task = future_to_task[future]
-                            try:
-                                future.result()  # 获取结果，触发异常处理
-                            except Exception as e:
-                                print(f"任务 {task.task_id} 执行失败: {e}")
-                            finally:
-                                del future_to_task[future]
+                # 失败任务的后继永远不会就绪
+                if task.status != "completed":
                     continue
                 
-                # 提交可执行的任务
-                for task in ready_tasks:
-                    future = executor.submit(self.execute_task, task, tools)
-                    future_to_task[future] = task
-                
-                # 等待至少一个任务完成
-                if future_to_task:
-                    completed_futures = as_completed(future_to_task.keys(), timeout=1.0)
-                    for future in completed_futures:
-                        task = future_to_task[future]
-                        try:
-                            future.result()
-                        except Exception as e:
-                            print(f"任务 {task.task_id} 执行失败: {e}")
-                        finally:
-                            del future_to_task[future]
-                        break  # 只处理一个完成的任务，然后重新评估
+                # 依赖已全部完成的后继任务进入就绪队列
+                for child_id in self.children.get(task.task_id, []):
+                    if child_id not in self.tasks:
+                        continue
+                    self.remaining_deps[child_id] -= 1
+                    if self.remaining_deps[child_id] == 0:
+                        ready.append(self.tasks[child_id])
         
         return self.results
 
 class LLMCompilerAgent:
     """LLM Compiler Agent - 将任务编译为DAG并并行执行"""
     
-    def __init__(self, tools: List[Tool], max_workers: int = 3):
+    def __init__(self, tools: List[Tool], max_workers: int = 3, simulate_latency: bool = False,
+                 verbose: bool = True):
         self.tools = {tool.name: tool for tool in tools}
+        self.verbose = verbose
+        for tool in tools:
+            tool.SIMULATE_LATENCY = simulate_latency
         self.max_workers = max_workers
         self.dag_executor = None
+        self._last_status: Optional[str] = None  # 上次输出的状态行
+        # (规则分支, 输入个数) -> 任务模板列表，模板输入为 str.format 格式串
+        self._plan_cache: Dict[Tuple[str, int], List[Task]] = {}
     
     def _get_tool_descriptions(self) -> str:
         """获取工具描述"""
@@ -256,66 +396,86 @@ class LLMCompilerAgent:
     
     def _compile_to_dag(self, question: str) -> DAGExecutor:
         """将问题编译为DAG（简化版规则）"""
-        executor = DAGExecutor(self.max_workers)
-        question_lower = question.lower()
+        branch = _compile_signature(question.lower())
+        bindings = self._bind_inputs(branch, question)
         
-        if "计算" in question_lower and "搜索" in question_lower:
+        # 同一签名的DAG骨架只构建一次，之后仅绑定新的输入
+        signature = (branch, len(bindings))
+        templates = self._plan_cache.get(signature)
+        if templates is None:
+            templates = self._plan_cache[signature] = self._build_templates(*signature)
+        
+        executor = DAGExecutor(self.max_workers)
+        for template in templates:
+            executor.add_task(template.clone_with(template.tool_input.format(*bindings)))
+        return executor
+    
+    def _bind_inputs(self, branch: str, question: str) -> Tuple[str, ...]:
+        """提取需要绑定到DAG模板中的输入"""
+        if branch == "compare":
+            # 并行搜索进行比较，至少需要两个关键词
+            keywords = self._extract_keywords(question)
+            return tuple(keywords[:2]) if len(keywords) >= 2 else ()
+        elif branch == "calc":
+            math_expr = self._extract_math_expression(question)
+            return (math_expr,) if math_expr else ()
+        elif branch == "search":
+            return tuple(self._extract_keywords(question))
+        elif branch == "default":
+            return (question[:20],)
+        return ()
+    
+    def _build_templates(self, branch: str, arity: int) -> List[Task]:
+        """构建DAG骨架，输入中的 {i} 为第 i 个绑定输入的占位符"""
+        if branch == "search_calc":
             # 复合任务：搜索后计算
-            executor.add_task(Task("search1", "search", "价格"))
-            executor.add_task(Task("search2", "search", "销量"))
-            executor.add_task(Task("calc1", "calculator", "$search1 * $search2", ["search1", "search2"]))
-            
-        elif "报告" in question_lower or "总结" in question_lower:
+            return [
+                Task("search1", "search", "价格"),
+                Task("search2", "search", "销量"),
+                Task("calc1", "calculator", "$search1 * $search2", ["search1", "search2"])
+            ]
+        elif branch == "report":
             # 并行搜索多个信息源
-            executor.add_task(Task("weather", "search", "天气"))
-            executor.add_task(Task("stock", "search", "股票"))
-            executor.add_task(Task("news", "search", "新闻"))
-            executor.add_task(Task("report", "file_writer", "report.txt|天气: $weather\n股票: $stock\n新闻: $news", 
-                             ["weather", "stock", "news"]))
-            
-        elif "比较" in question_lower:
-            # 并行搜索进行比较
-            keywords = self._extract_keywords(question)
-            if len(keywords) >= 2:
-                executor.add_task(Task("info1", "search", keywords[0]))
-                executor.add_task(Task("info2", "search", keywords[1]))
-                executor.add_task(Task("compare", "file_writer", f"comparison.txt|{keywords[0]}: $info1\n{keywords[1]}: $info2", 
-                                 ["info1", "info2"]))
-        
-        elif "计算" in question_lower:
+            return [
+                Task("weather", "search", "天气"),
+                Task("stock", "search", "股票"),
+                Task("news", "search", "新闻"),
+                Task("report", "file_writer", "report.txt|天气: $weather\n股票: $stock\n新闻: $news",
+                     ["weather", "stock", "news"])
+            ]
+        elif branch == "compare":
+            if arity < 2:
+                return []
+            return [
+                Task("info1", "search", "{0}"),
+                Task("info2", "search", "{1}"),
+                Task("compare", "file_writer", "comparison.txt|{0}: $info1\n{1}: $info2",
+                     ["info1", "info2"])
+            ]
+        elif branch == "calc":
             # 简单计算任务
-            math_expr = self._extract_math_expression(question)
-            if math_expr:
-                executor.add_task(Task("calc", "calculator", math_expr))
-        
-        elif "搜索" in question_lower:
+            return [Task("calc", "calculator", "{0}")] if arity else []
+        elif branch == "search":
             # 搜索任务
-            keywords = self._extract_keywords(question)
-            for i, keyword in enumerate(keywords):
-                executor.add_task(Task(f"search{i+1}", "search", keyword))
-        
+            return [Task(f"search{i+1}", "search", f"{{{i}}}") for i in range(arity)]
         else:
             # 默认搜索
-            executor.add_task(Task("default", "search", question[:20]))
-        
-        return executor
+            return [Task("default", "search", "{0}")]
     
     def _extract_math_expression(self, text: str) -> str:
         """提取数学表达式"""
-        pattern = r'[\d+\-*/().\s]+'
-        matches = re.findall(pattern, text)
-        if matches:
-            return max(matches, key=len).strip()
-        return ""
+        # 流式保留最长匹配，无需先构建全部匹配列表
+        best = ""
+        for match in _MATH_RE.finditer(text):
+            candidate = match.group(0)
+            if len(candidate) > len(best):
+                best = candidate
+        return best.strip()
     
     def _extract_keywords(self, text: str) -> List[str]:
         """提取关键词"""
-        keywords = ["北京", "上海", "python", "天气", "股票", "新闻", "react", "价格", "销量"]
-        found_keywords = []
-        text_lower = text.lower()
-        for keyword in keywords:
-            if keyword in text_lower:
-                found_keywords.append(keyword)
+        found = set(_KEYWORD_RE.findall(text.lower()))
+        found_keywords = [keyword for keyword in _KEYWORDS if keyword in found]
         return found_keywords if found_keywords else ["信息"]
     
     def run(self, question: str) -> str:
@@ -339,29 +499,14 @@ class LLMCompilerAgent:
         print("=== 执行阶段 ===")
         start_time = time.time()
         
-        # 实时显示执行状态
-        def print_status():
-            while True:
-                with self.dag_executor.lock:
-                    all_completed = all(task.status in ["completed", "failed"] for task in self.dag_executor.tasks.values())
-                    
-                    print("\r执行状态: ", end="")
-                    for task in self.dag_executor.tasks.values():
-                        print(f"{task.task_id}({task.status[:1]}) ", end="")
-                    print("", end="", flush=True)
-                    
-                    if all_completed:
-                        break
-                
-                time.sleep(0.5)
-        
-        # 启动状态显示线程
-        import threading
-        status_thread = threading.Thread(target=print_status, daemon=True)
-        status_thread.start()
+        # 实时显示执行状态：仅在任务状态变化时刷新
+        if self.verbose:
+            self._last_status = None
+            self.dag_executor.on_status_change = self._print_status
+            self._print_status()
         
         # 执行DAG
-        results = self.dag_executor.execute_dag(self.tools)
+        results = asyncio.run(self.dag_executor.execute_dag(self.tools))
         
         end_time = time.time()
         print(f"\n执行完成，总耗时: {end_time - start_time:.2f}秒\n")
@@ -374,6 +519,16 @@ class LLMCompilerAgent:
         print(f"最终答案: {final_result}")
         return final_result
     
+    def _print_status(self):
+        """打印各任务的当前状态（状态未变化时不输出）"""
+        status = "".join(f"{task.task_id}({task.status[:1]}) " for task in self.dag_executor.tasks.values())
+        if status == self._last_status:
+            return
+        self._last_status = status
+        # 整行一次写出，只刷新一次
+        sys.stdout.write(f"\r执行状态: {status}")
+        sys.stdout.flush()
+    
     def _print_execution_summary(self):
         """打印执行摘要"""
         print("执行摘要:")
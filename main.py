@@ -1,7 +1,13 @@
 import time
 import os
-import json
-from openai import OpenAI
+import asyncio
+import hashlib
+import sqlite3
+import functools
+import threading
+import httpx
+import orjson
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
 from tavily import TavilyClient
 
@@ -12,6 +18,92 @@ os.environ['OPENAI_BASE_URL'] = os.getenv('DASHSCOPE_BASE_URL')
 
 dirname = os.path.dirname(__file__)
 
+MODEL_NAME = 'qwen-plus'
+LLM_CACHE_PATH = os.path.join(dirname, '.devin_cache.sqlite3')
+LLM_CACHE_TTL = 7 * 24 * 3600  # LLM响应缓存有效期（秒），持久化的条目过期后不再使用
+LLM_CACHE_SIZE = 256  # 内存中保留的LLM响应最大条目数
+SEARCH_CACHE_TTL = 600  # 搜索结果缓存有效期（秒）
+SEARCH_CACHE_SIZE = 256  # 搜索结果缓存的最大条目数
+HISTORY_WINDOW = 20  # 保留的最近消息条数（不含系统提示词和摘要），更早的消息会被总结
+
+def ttl_cache(ttl, maxsize=128):
+  '''按调用参数缓存函数结果，超过 ttl 秒后失效，最多保留 maxsize 条；抛出异常的调用不会被缓存'''
+  def decorator(func):
+    # 条目按写入时间排列（过期条目会先删除再重新写入），最早的条目总在最前面
+    cache = {}
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+      key = (args, tuple(sorted(kwargs.items())))
+      with lock:
+        hit = cache.get(key)
+        if hit is not None:
+          if time.monotonic() - hit[0] < ttl:
+            return hit[1]
+          del cache[key]
+      result = func(*args, **kwargs)
+      with lock:
+        now = time.monotonic()
+        cache.pop(key, None)
+        cache[key] = (now, result)
+        # 从最早的条目开始清掉过期条目，并把总数限制在 maxsize 以内
+        while cache:
+          oldest = next(iter(cache))
+          if len(cache) <= maxsize and now - cache[oldest][0] < ttl:
+            break
+          del cache[oldest]
+      return result
+    return wrapper
+  return decorator
+
+class LLMCache:
+  '''LLM响应的精确匹配缓存：内存字典 + SQLite持久化，重启后在 ttl 秒内仍然有效'''
+  def __init__(self, path=LLM_CACHE_PATH, ttl=LLM_CACHE_TTL, maxsize=LLM_CACHE_SIZE):
+    self.ttl = ttl
+    self.maxsize = maxsize
+    # key -> (写入时间, 内容)，按写入顺序排列，超出 maxsize 时淘汰最早的条目
+    self.memory = {}
+    self.conn = sqlite3.connect(path)
+    columns = [row[1] for row in self.conn.execute('PRAGMA table_info(llm_cache)')]
+    with self.conn:
+      if columns and 'created_at' not in columns:
+        # 旧版本的表没有写入时间，无法判断条目是否过期，直接重建
+        self.conn.execute('DROP TABLE llm_cache')
+      self.conn.execute('CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, content TEXT, created_at REAL)')
+      self.conn.execute('DELETE FROM llm_cache WHERE created_at < ?', (time.time() - ttl,))
+
+  @staticmethod
+  def make_key(model, messages):
+    payload = orjson.dumps([model, messages], option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.sha256(payload).hexdigest()
+
+  def get(self, key):
+    entry = self.memory.get(key)
+    if entry is None:
+      entry = self.conn.execute('SELECT created_at, content FROM llm_cache WHERE key = ?', (key,)).fetchone()
+      if entry is None:
+        return None
+      self.remember(key, entry)
+    if time.time() - entry[0] >= self.ttl:
+      # 过期条目不再使用，重新生成后由 set 覆盖
+      return None
+    return entry[1]
+
+  def set(self, key, content):
+    now = time.time()
+    self.remember(key, (now, content))
+    with self.conn:
+      self.conn.execute('INSERT OR REPLACE INTO llm_cache (key, content, created_at) VALUES (?, ?, ?)', (key, content, now))
+      # 顺带清理过期条目，数据库大小不会无限增长
+      self.conn.execute('DELETE FROM llm_cache WHERE created_at < ?', (now - self.ttl,))
+
+  def remember(self, key, entry):
+    self.memory.pop(key, None)
+    self.memory[key] = entry
+    if len(self.memory) > self.maxsize:
+      del self.memory[next(iter(self.memory))]
+
 def get_current_time():
   return time.strftime('%H:%M:%S', time.localtime())
 
@@ -32,10 +124,26 @@ def write_file(file_path, content, append=False):
   except Exception as e:
     return f'Error writing file {file_path}: {e}'
 
+@functools.lru_cache(maxsize=1)
+def get_tavily_client():
+  '''进程内共享的 Tavily 客户端，复用其HTTP连接'''
+  return TavilyClient()
+
+@functools.lru_cache(maxsize=1)
+def get_llm_client():
+  '''进程内共享的 LLM 客户端，保持连接池常驻以复用 TLS 连接'''
+  http_client = DefaultAsyncHttpxClient(
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+  )
+  return AsyncOpenAI(http_client=http_client)
+
+@ttl_cache(SEARCH_CACHE_TTL, SEARCH_CACHE_SIZE)
+def fetch_tavily_results(query):
+  return get_tavily_client().search(query, language='zh-CN')
+
 def tavily_search(query):
   try:
-    client = TavilyClient()
-    response = client.search(query, language='zh-CN')
+    response = fetch_tavily_results(query)
     if response and 'results' in response:
       results = response['results']
       return '\n'.join(result['content'] for result in results)
@@ -165,61 +273,20 @@ tools = [
 react_agent_template = '''
 你是Devin，一个被设计来协助各种任务的人工智能代理，追求简洁的回答策略，不要涉及法律问题。
 
-工具:
-------
-
-您可以使用以下工具：
-
-{tools}
-
-要使用工具，请使用以下格式：
-
-{{
-  "action": {{
-    "name": "要采取的动作，应该是[{tool_names}]之一。",
-    "args": {{
-      "参数1": "值1",
-      "参数2": "值2"
-    }},
-  }},
-  "thoughts": {{
-    "text": "如果需要，描述你的思考过程",
-    "reasoning": "如果需要，描述你的推理过程" ,
-    "criticism": "如果需要，描述你的批评或反思",
-    "plan": "如果需要，描述你的计划",
-    "observation": "如果需要，描述你的观察结果"
-  }}
-}}
-
-
-当你有话要对人类说，或者如果你不需要使用工具，你必须使用以下格式：
-
-{{
-  "action": {{
-    "name": "finish",
-    "args": {{
-      "speak": "你的最终答案"
-    }}
-  }}
-}}
-
-开始吧!
-
-以前的对话记录：
-{chat_history}
-
-新输入：{input}
+需要时请调用提供的工具；多个相互独立的工具调用可以在同一次回复中同时发出，它们会被并行执行。
+当你有话要对人类说，或者不再需要使用工具时，直接用文字回复最终答案。
+'''
 
-{agent_scratchpad}
+summary_template = '''
+请用简洁的中文总结以下对话，保留其中的事实、结论以及尚未完成的任务：
 
-确保输出结果是有效的JSON字符串格式，并且可以由python的`json.loads`函数直接解析。
+{conversation}
 '''
 
 class Devin:
   def __init__(self):
-    self.client = OpenAI()
-    self.chat_history = []
-    self.agent_scratch = ''
+    self.client = get_llm_client()
+    self.llm_cache = LLMCache()
     self.available_tools = {
       'get_current_time': get_current_time,
       'read_file': read_file,
@@ -227,33 +294,141 @@ class Devin:
       'tavily_search': tavily_search,
       'calculate': calculate,
     }
-
-  def generate_prompt(self, query):
-    return react_agent_template.format(
-      tools=json.dumps([tool['function'] for tool in tools], indent=2, ensure_ascii=False),
-      tool_names=', '.join(tool['function']['name'] for tool in tools),
-      chat_history='\n'.join(f"{msg['role']}: {msg['content']}" for msg in self.chat_history),
-      input=query,
-      agent_scratchpad=self.agent_scratch
-    )
-
-  def invoke_llm(self, prompt):
-    completion = self.client.chat.completions.create(
-      model='qwen-plus',
+    # 系统提示词固定不变（工具定义通过原生 function calling 传给模型），对话记录只追加增量消息，
+    # 使每轮请求共享稳定的前缀，便于服务端复用前缀缓存
+    self.system_prompt = react_agent_template
+    self.chat_history = [{'role':'system', 'content':self.system_prompt}]
+    # 窗口之外的早期对话摘要
+    self.summary = ''
+    # 流式生成期间提前启动的工具调用：序号 -> Task
+    self.pending_calls = {}
+
+  async def invoke_llm(self):
+    '''调用模型并返回助手消息'''
+    cache_key = LLMCache.make_key(MODEL_NAME, self.chat_history)
+    cached = self.llm_cache.get(cache_key)
+
+    self.pending_calls = {}
+
+    if cached is not None:
+      message = orjson.loads(cached)
+      if message.get('content'):
+        print(message['content'])
+    else:
+      try:
+        message = await self.stream_llm()
+        self.llm_cache.set(cache_key, orjson.dumps(message).decode())
+      except BaseException:
+        # 流式读取中途出错（如网络中断）时，取消已提前启动的工具调用并等待其结束，
+        # 避免它们在后台继续执行（如写文件）或留下无人处理的异常
+        await self.cancel_pending_calls()
+        raise
+    return message
+
+  async def cancel_pending_calls(self):
+    tasks = list(self.pending_calls.values())
+    self.pending_calls = {}
+    for task in tasks:
+      task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+  async def stream_llm(self):
+    '''流式读取模型输出：某个工具调用的参数一旦完整即提前开始执行'''
+    stream = await self.client.chat.completions.create(
+      model=MODEL_NAME,
       messages=self.chat_history,
+      tools=tools,
+      tool_choice='auto',
+      stream=True,
     )
-    chat_completion_message = completion.choices[0].message 
-
-    print(chat_completion_message.content)
+    content_parts = []
+    tool_calls = []
 
-    response = json.loads(chat_completion_message.content)
-    return response
-  
-  def execute(self, query):
+    async for chunk in stream:
+      if not chunk.choices:
+        continue
+      delta = chunk.choices[0].delta
+      if delta.content:
+        content_parts.append(delta.content)
+        print(delta.content, end='', flush=True)
+
+      for tool_call in delta.tool_calls or []:
+        if tool_call.index >= len(tool_calls):
+          # 新的调用开始，说明前一个调用的参数已经完整
+          if tool_calls:
+            self.dispatch(len(tool_calls) - 1, tool_calls[-1])
+          tool_calls.append({'id':'', 'type':'function', 'function':{'name':'', 'arguments':''}})
+        call = tool_calls[tool_call.index]
+        if tool_call.id:
+          call['id'] = tool_call.id
+        if tool_call.function:
+          call['function']['name'] += tool_call.function.name or ''
+          call['function']['arguments'] += tool_call.function.arguments or ''
+
+    if tool_calls:
+      self.dispatch(len(tool_calls) - 1, tool_calls[-1])
+    if content_parts:
+      print()
+
+    message = {'role':'assistant', 'content':''.join(content_parts) or None}
+    if tool_calls:
+      message['tool_calls'] = tool_calls
+    return message
+
+  def dispatch(self, index, call):
+    self.pending_calls[index] = asyncio.create_task(self.run_tool_call(call))
+
+  async def run_tool_call(self, call):
+    name = call['function']['name']
+    tool_func = self.available_tools.get(name)
+    if not tool_func:
+      return f'Unknown tool: {name}'
+    try:
+      args = orjson.loads(call['function']['arguments'] or '{}')
+      # 工具函数均为阻塞调用（文件/网络），放到线程中执行以免阻塞事件循环
+      return await asyncio.to_thread(tool_func, **args)
+    except Exception as e:
+      # 错误作为工具结果返回给模型，由模型自行修正，无需整轮重试
+      return f'Error calling {name}: {e}'
+
+  async def summarize(self, messages):
+    conversation = '\n'.join(
+      f"{msg['role']}: {msg.get('content') or msg.get('tool_calls')}" for msg in messages
+    )
+    if self.summary:
+      conversation = f'之前的摘要: {self.summary}\n{conversation}'
+    completion = await self.client.chat.completions.create(
+      model=MODEL_NAME,
+      messages=[{'role':'user', 'content':summary_template.format(conversation=conversation)}],
+    )
+    return completion.choices[0].message.content
+
+  async def compact_history(self):
+    '''对话超出窗口时，把较早的消息总结为一条系统消息，只保留最近的消息'''
+    head = 2 if self.summary else 1
+    recent = self.chat_history[head:]
+    if len(recent) <= HISTORY_WINDOW:
+      return
+
+    # 从窗口起点向后找到第一条用户消息作为切分点，保证每轮对话（含工具调用）完整
+    cut = len(recent) - HISTORY_WINDOW
+    while cut < len(recent) and recent[cut]['role'] != 'user':
+      cut += 1
+    if cut == len(recent):
+      return
+
+    self.summary = await self.summarize(recent[:cut])
+    self.chat_history = [
+      {'role':'system', 'content':self.system_prompt},
+      {'role':'system', 'content':f'之前对话的摘要：\n{self.summary}'},
+      *recent[cut:],
+    ]
+
+  async def execute(self, query):
     count = 0
 
-    prompt = self.generate_prompt(query)
-    self.chat_history.append({'role':'system', 'content':prompt})
+    await self.compact_history()
+    self.chat_history.append({'role':'user', 'content':query})
 
     while count < 7:
       count += 1
@@ -261,52 +436,44 @@ class Devin:
       start_time = time.time()
       print(f'[{count}]：开始调用LLM处理...')
 
-      response = self.invoke_llm(prompt)
+      message = await self.invoke_llm()
 
       end_time = time.time()
       print(f'[{count}]：LLM处理完成，耗时：{end_time - start_time:.2f}秒')
 
-      if not (response and isinstance(response, dict)):
-        print(f'[{count}]：LLM处理结果异常，重新尝试...')
-        continue
-      
-      action = response.get('action')
-      action_name = action.get('name')
-      action_args = action.get('args', {})
-      
-      if action_name == 'finish':
-        answer = action_args.get('speak')
+      tool_calls = message.get('tool_calls')
+      if not tool_calls:
+        answer = message.get('content')
         print(f'Assistant: {answer}')
-        self.chat_history.append({'role':'user', 'content':query})
         self.chat_history.append({'role':'assistant', 'content':answer})
         break
 
-      try:
-        tool_func = self.available_tools.get(action_name)
-        result = tool_func(**action_args) if tool_func else None
-        
-        self.agent_scratch += f'Action: {action_name}, Args: {action_args}, Result: {result}\n'
-        print(f'[{count}]：动作执行成功，结果：{result}')
-        
-        self.chat_history.append({'role':'user', 'content':query})
-        self.chat_history.append({'role':'assistant', 'content': result})
-      except Exception as e:
-        print(f'[{count}]：执行动作失败，错误：{e}')
-        continue
+      # 流式阶段尚未启动的调用（如命中缓存）在此启动，所有调用并行执行
+      tasks = [
+        self.pending_calls.pop(index, None) or asyncio.create_task(self.run_tool_call(call))
+        for index, call in enumerate(tool_calls)
+      ]
+      results = await asyncio.gather(*tasks)
+
+      self.chat_history.append(message)
+      for call, result in zip(tool_calls, results):
+        print(f'[{count}]：动作执行完成，结果：{result}')
+
+        self.chat_history.append({'role':'tool', 'tool_call_id':call['id'], 'content':str(result)})
 
     if count >= 7:
       print('执行任务失败')
     else:
       pass
 
-  def start(self):
+  async def start(self):
     while True:
-      user_input = input('User: ')
+      user_input = await asyncio.to_thread(input, 'User: ')
       if user_input.lower() == 'q':
         print(f'[{get_current_time()}]：Devin AI Agent 关闭...') 
         break
-      self.execute(user_input)
+      await self.execute(user_input)
 
 if __name__ == '__main__':
   print(f'[{get_current_time()}]：Devin AI Agent 启动...')   
-  Devin().start()
+  asyncio.run(Devin().start())
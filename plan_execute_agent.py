@@ -1,7 +1,68 @@
 import re
+import ast
 import json
+import asyncio
+import operator
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
+# 关键词表及其编译后的多模式正则（单次扫描匹配所有关键词）
+_KEYWORDS = ("北京", "上海", "python", "天气", "股票", "新闻")
+_KEYWORD_RE = re.compile("|".join(map(re.escape, _KEYWORDS)))
+
+# 预编译的正则表达式
+_MATH_RE = re.compile(r'[\d+\-*/().\s]+')
+
+# 计算器不允许的字符（数字、运算符、括号、小数点和空白以外的字符），命中即可提前返回
+_DISALLOWED_RE = re.compile(r'[^0-9+\-*/().\s]')
+
+# 工具结果缓存的最大条目数，超出后淘汰最早写入的条目
+_CACHE_MAX = 256
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Pow: operator.pow
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+def _eval_node(node: ast.AST):
+    """递归求值算术表达式的语法树，只接受数字和算术运算"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    raise ValueError(f"不支持的表达式: {type(node).__name__}")
+
+@lru_cache(maxsize=512)
+def _eval_arith(expr: str):
+    """解析并求值算术表达式，不经过 eval；结果按表达式缓存"""
+    return _eval_node(ast.parse(expr.strip(), mode='eval').body)
+
+def _first_hit_finder(keys):
+    """构建查找函数：返回文本中出现的、在 keys 中顺序最靠前的关键词，未命中时返回 None
+    
+    零宽前瞻在每个位置取最长命中，同一位置命中的其他关键词都是它的前缀，
+    因此预先为每个关键词算出其前缀中最靠前的一个，单次扫描即可得到结果
+    """
+    keys = tuple(keys)
+    rank = {key: index for index, key in enumerate(keys)}
+    earliest_prefix = {key: next(other for other in keys if key.startswith(other)) for key in keys}
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, sorted(keys, key=len, reverse=True))) + "))")
+    
+    def first_hit(text: str) -> Optional[str]:
+        hits = pattern.findall(text)
+        if not hits:
+            return None
+        return min((earliest_prefix[hit] for hit in hits), key=rank.__getitem__)
+    
+    return first_hit
+
 class Tool:
     """工具基类"""
     def __init__(self, name: str, description: str):
@@ -10,6 +71,10 @@ class Tool:
     
     def execute(self, input_text: str) -> str:
         raise NotImplementedError
+    
+    async def execute_async(self, input_text: str) -> str:
+        """异步执行，纯内存工具默认直接调用同步实现"""
+        return self.execute(input_text)
 
 class Calculator(Tool):
     """计算器工具"""
@@ -21,11 +86,10 @@ class Calculator(Tool):
     
     def execute(self, input_text: str) -> str:
         try:
-            allowed_chars = set('0123456789+-*/().')
-            if not all(c in allowed_chars or c.isspace() for c in input_text):
+            if _DISALLOWED_RE.search(input_text):
                 return "错误：包含不允许的字符"
             
-            result = eval(input_text)
+            result = _eval_arith(input_text)
             return str(result)
         except Exception as e:
             return f"计算错误: {str(e)}"
@@ -45,12 +109,24 @@ class Search(Tool):
             "股票": "今日股市上涨2.5%，科技股表现强劲",
             "新闻": "最新科技新闻：AI技术在各行业应用加速"
         }
+        # 单次扫描查询串；包含多个关键词时按知识库顺序取第一个
+        self._first_hit = _first_hit_finder(self.knowledge)
+        self._cache: Dict[str, str] = {}
     
     def execute(self, input_text: str) -> str:
+        # 搜索是输入的纯函数，重复查询直接返回缓存结果
+        result = self._cache.get(input_text)
+        if result is None:
+            if len(self._cache) >= _CACHE_MAX:
+                del self._cache[next(iter(self._cache))]
+            result = self._cache[input_text] = self._search(input_text)
+        return result
+    
+    def _search(self, input_text: str) -> str:
         query = input_text.lower().strip()
-        for key, value in self.knowledge.items():
-            if key in query:
-                return value
+        key = self._first_hit(query)
+        if key is not None:
+            return self.knowledge[key]
         return f"未找到关于'{input_text}'的信息"
 
 class FileWriter(Tool):
@@ -75,14 +151,20 @@ class FileWriter(Tool):
             return f"成功写入文件: {filename}"
         except Exception as e:
             return f"文件写入错误: {str(e)}"
+    
+    async def execute_async(self, input_text: str) -> str:
+        # 文件写入会阻塞，放到线程中执行以免阻塞事件循环
+        return await asyncio.to_thread(self.execute, input_text)
 
 class Step:
     """执行步骤"""
-    def __init__(self, step_id: int, description: str, tool_name: str = None, tool_input: str = None):
+    def __init__(self, step_id: int, description: str, tool_name: str = None, tool_input: str = None,
+                 parallel_group: Optional[int] = None):
         self.step_id = step_id
         self.description = description
         self.tool_name = tool_name
         self.tool_input = tool_input
+        self.parallel_group = parallel_group  # 同组的连续步骤相互独立，可并发执行
         self.result = None
         self.completed = False
     
@@ -98,6 +180,9 @@ class PlanAndExecuteAgent:
         self.max_steps = max_steps
         self.plan = []
         self.execution_log = []
+        # 随步骤完成增量维护，写文件步骤无需回扫整个计划
+        self._search_results: List[str] = []
+        self._report_parts: List[str] = []
     
     def _get_tool_descriptions(self) -> str:
         """获取工具描述"""
@@ -139,9 +224,10 @@ class PlanAndExecuteAgent:
             # 复合任务：生成报告
             topics = ["天气", "股票", "新闻"]
             for topic in topics:
-                plan.append(Step(step_id, f"搜索{topic}信息", "search", topic))
+                plan.append(Step(step_id, f"搜索{topic}信息", "search", topic, parallel_group=1))
                 step_id += 1
-            plan.append(Step(step_id, "生成报告文件", "file_writer", "report.txt|综合报告内容"))
+            # 报告依赖全部搜索结果，单独成组
+            plan.append(Step(step_id, "生成报告文件", "file_writer", "report.txt|综合报告内容", parallel_group=2))
             step_id += 1
         
         else:
@@ -152,25 +238,21 @@ class PlanAndExecuteAgent:
     
     def _extract_math_expression(self, text: str) -> str:
         """提取数学表达式"""
-        # 简单的数学表达式提取
-        pattern = r'[\d+\-*/().\s]+'
-        matches = re.findall(pattern, text)
-        if matches:
-            # 返回最长的匹配
-            return max(matches, key=len).strip()
-        return ""
+        # 简单的数学表达式提取：流式保留最长匹配
+        best = ""
+        for match in _MATH_RE.finditer(text):
+            candidate = match.group(0)
+            if len(candidate) > len(best):
+                best = candidate
+        return best.strip()
     
     def _extract_keywords(self, text: str) -> List[str]:
         """提取关键词"""
-        keywords = ["北京", "上海", "python", "天气", "股票", "新闻"]
-        found_keywords = []
-        text_lower = text.lower()
-        for keyword in keywords:
-            if keyword in text_lower:
-                found_keywords.append(keyword)
+        found = set(_KEYWORD_RE.findall(text.lower()))
+        found_keywords = [keyword for keyword in _KEYWORDS if keyword in found]
         return found_keywords if found_keywords else ["python"]  # 默认关键词
     
-    def _execute_step(self, step: Step) -> str:
+    async def _execute_step(self, step: Step) -> str:
         """执行单个步骤"""
         if step.tool_name and step.tool_name in self.tools:
             tool = self.tools[step.tool_name]
@@ -180,24 +262,16 @@ class PlanAndExecuteAgent:
             if step.tool_name == "file_writer" and "|" in tool_input:
                 filename, content_template = tool_input.split('|', 1)
                 if "搜索到的信息" in content_template:
-                    # 收集之前搜索步骤的结果
-                    search_results = []
-                    for prev_step in self.plan:
-                        if prev_step.completed and prev_step.tool_name == "search":
-                            search_results.append(f"{prev_step.description}: {prev_step.result}")
-                    
-                    if search_results:
-                        content = "\n".join(search_results)
+                    # 使用之前搜索步骤的结果
+                    if self._search_results:
+                        content = "\n".join(self._search_results)
                         tool_input = f"{filename}|{content}"
                 elif "综合报告内容" in content_template:
                     # 生成综合报告
-                    report_content = "=== 综合信息报告 ===\n\n"
-                    for prev_step in self.plan:
-                        if prev_step.completed and prev_step.result:
-                            report_content += f"{prev_step.description}:\n{prev_step.result}\n\n"
+                    report_content = "=== 综合信息报告 ===\n\n" + "".join(self._report_parts)
                     tool_input = f"{filename}|{report_content}"
             
-            result = tool.execute(tool_input)
+            result = await tool.execute_async(tool_input)
             step.result = result
             step.completed = True
             return result
@@ -207,13 +281,34 @@ class PlanAndExecuteAgent:
             step.completed = True
             return error_msg
     
-    def run(self, question: str) -> str:
+    def _record_result(self, step: Step):
+        """记录已完成步骤的结果，供后续写文件步骤使用"""
+        if not step.result:
+            return
+        if step.tool_name == "search":
+            self._search_results.append(f"{step.description}: {step.result}")
+        self._report_parts.append(f"{step.description}:\n{step.result}\n\n")
+    
+    def _group_steps(self) -> List[List[Step]]:
+        """按并行组切分计划：同组的连续步骤为一批，未分组的步骤各自成批"""
+        groups = []
+        for step in self.plan:
+            if (groups and step.parallel_group is not None
+                    and groups[-1][-1].parallel_group == step.parallel_group):
+                groups[-1].append(step)
+            else:
+                groups.append([step])
+        return groups
+    
+    async def run(self, question: str) -> str:
         """运行Plan-and-Execute循环"""
         print(f"问题: {question}\n")
         
         # 阶段1: 制定计划
         print("=== 制定执行计划 ===")
         self.plan = self._create_plan(question)
+        self._search_results = []
+        self._report_parts = []
         
         if not self.plan:
             return "无法为此问题制定执行计划"
@@ -223,28 +318,39 @@ class PlanAndExecuteAgent:
             print(f"  {step}")
         print()
         
-        # 阶段2: 执行计划
+        # 阶段2: 执行计划（同时统计完成步骤数，无需再次遍历计划）
         print("=== 执行计划 ===")
         results = []
+        completed_count = 0
         
-        for step in self.plan:
-            print(f"执行: {step.description}")
-            
-            if step.tool_name:
-                result = self._execute_step(step)
-                print(f"结果: {result}")
-                results.append(result)
-                self.execution_log.append(f"Step {step.step_id}: {step.description} -> {result}")
+        for group in self._group_steps():
+            # 组内步骤并发执行，结果按计划顺序输出和记录；单个步骤直接执行，无需创建任务
+            tool_steps = [step for step in group if step.tool_name]
+            if len(tool_steps) > 1:
+                group_results = iter(await asyncio.gather(*(self._execute_step(step) for step in tool_steps)))
             else:
-                step.completed = True
-                print("完成")
+                group_results = iter([await self._execute_step(step) for step in tool_steps])
             
-            print()
+            for step in group:
+                print(f"执行: {step.description}")
+                
+                if step.tool_name:
+                    result = next(group_results)
+                    self._record_result(step)
+                    print(f"结果: {result}")
+                    results.append(result)
+                    self.execution_log.append(f"Step {step.step_id}: {step.description} -> {result}")
+                else:
+                    step.completed = True
+                    print("完成")
+                
+                if step.completed:
+                    completed_count += 1
+                print()
         
         # 阶段3: 总结结果
         print("=== 执行总结 ===")
-        completed_steps = [step for step in self.plan if step.completed]
-        print(f"完成步骤: {len(completed_steps)}/{len(self.plan)}")
+        print(f"完成步骤: {completed_count}/{len(self.plan)}")
         
         if results:
             final_result = results[-1]  # 最后一个结果作为最终答案
@@ -263,7 +369,7 @@ class PlanAndExecuteAgent:
                 summary += f"   结果: {step.result}\n"
         return summary
 
-def main():
+async def main():
     """演示用法"""
     # 创建工具
     tools = [
@@ -272,8 +378,6 @@ def main():
         FileWriter()
     ]
     
-    # 创建Agent
-    agent = PlanAndExecuteAgent(tools)
     
     # 测试问题
     questions = [
@@ -282,12 +386,18 @@ def main():
         "生成一份包含天气、股票和新闻的综合报告"
     ]
     
-    for question in questions:
+    async def run_question(question: str) -> str:
+        # 每个问题使用独立的Agent，避免并发运行时共享计划和日志
+        agent = PlanAndExecuteAgent(tools)
         print("=" * 60)
-        result = agent.run(question)
+        result = await agent.run(question)
         print("\n" + agent.get_execution_summary())
         print("=" * 60)
         print()
+        return result
+    
+    # 各问题的运行互不依赖，并发执行
+    await asyncio.gather(*(run_question(question) for question in questions))
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
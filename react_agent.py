@@ -1,7 +1,65 @@
 import re
+import ast
 import json
+import asyncio
+import operator
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
+# 预编译的正则表达式
+_ACTION_RE = re.compile(r"Action:\s*(\w+)\[([^\]]*)\]")
+_STOP_RE = re.compile(r"Final Answer:|最终答案:|结论:|答案:", re.IGNORECASE)
+
+# 计算器不允许的字符（数字、运算符、括号、小数点和空白以外的字符），命中即可提前返回
+_DISALLOWED_RE = re.compile(r'[^0-9+\-*/().\s]')
+
+# 工具结果缓存的最大条目数，超出后淘汰最早写入的条目
+_CACHE_MAX = 256
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Pow: operator.pow
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+def _eval_node(node: ast.AST):
+    """递归求值算术表达式的语法树，只接受数字和算术运算"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_eval_node(node.left), _eval_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_node(node.operand))
+    raise ValueError(f"不支持的表达式: {type(node).__name__}")
+
+@lru_cache(maxsize=512)
+def _eval_arith(expr: str):
+    """解析并求值算术表达式，不经过 eval；结果按表达式缓存"""
+    return _eval_node(ast.parse(expr.strip(), mode='eval').body)
+
+def _first_hit_finder(keys):
+    """构建查找函数：返回文本中出现的、在 keys 中顺序最靠前的关键词，未命中时返回 None
+    
+    零宽前瞻在每个位置取最长命中，同一位置命中的其他关键词都是它的前缀，
+    因此预先为每个关键词算出其前缀中最靠前的一个，单次扫描即可得到结果
+    """
+    keys = tuple(keys)
+    rank = {key: index for index, key in enumerate(keys)}
+    earliest_prefix = {key: next(other for other in keys if key.startswith(other)) for key in keys}
+    pattern = re.compile("(?=(" + "|".join(map(re.escape, sorted(keys, key=len, reverse=True))) + "))")
+    
+    def first_hit(text: str) -> Optional[str]:
+        hits = pattern.findall(text)
+        if not hits:
+            return None
+        return min((earliest_prefix[hit] for hit in hits), key=rank.__getitem__)
+    
+    return first_hit
+
 class Tool:
     """工具基类"""
     def __init__(self, name: str, description: str):
@@ -10,6 +68,10 @@ class Tool:
     
     def execute(self, input_text: str) -> str:
         raise NotImplementedError
+    
+    async def execute_async(self, input_text: str) -> str:
+        """异步执行，纯内存工具默认直接调用同步实现"""
+        return self.execute(input_text)
 
 class Calculator(Tool):
     """计算器工具"""
@@ -22,11 +84,10 @@ class Calculator(Tool):
     def execute(self, input_text: str) -> str:
         try:
             # 安全的数学表达式求值
-            allowed_chars = set('0123456789+-*/().')
-            if not all(c in allowed_chars or c.isspace() for c in input_text):
+            if _DISALLOWED_RE.search(input_text):
                 return "错误：包含不允许的字符"
             
-            result = eval(input_text)
+            result = _eval_arith(input_text)
             return str(result)
         except Exception as e:
             return f"计算错误: {str(e)}"
@@ -45,12 +106,24 @@ class Search(Tool):
             "python": "Python是一种高级编程语言，广泛用于数据科学和AI",
             "react": "ReAct是一个结合推理和行动的AI框架"
         }
+        # 单次扫描查询串；包含多个关键词时按知识库顺序取第一个
+        self._first_hit = _first_hit_finder(self.knowledge)
+        self._cache: Dict[str, str] = {}
     
     def execute(self, input_text: str) -> str:
+        # 搜索是输入的纯函数，重复查询直接返回缓存结果
+        result = self._cache.get(input_text)
+        if result is None:
+            if len(self._cache) >= _CACHE_MAX:
+                del self._cache[next(iter(self._cache))]
+            result = self._cache[input_text] = self._search(input_text)
+        return result
+    
+    def _search(self, input_text: str) -> str:
         query = input_text.lower().strip()
-        for key, value in self.knowledge.items():
-            if key in query:
-                return value
+        key = self._first_hit(query)
+        if key is not None:
+            return self.knowledge[key]
         return f"未找到关于'{input_text}'的信息"
 
 class ReActAgent:
@@ -70,8 +143,7 @@ class ReActAgent:
     def _parse_action(self, text: str) -> Optional[tuple]:
         """解析行动指令"""
         # 匹配 Action: tool_name[input] 格式
-        pattern = r"Action:\s*(\w+)\[([^\]]*)\]"
-        match = re.search(pattern, text)
+        match = _ACTION_RE.search(text)
         if match:
             tool_name = match.group(1)
             tool_input = match.group(2)
@@ -80,15 +152,10 @@ class ReActAgent:
     
     def _should_stop(self, text: str) -> bool:
         """判断是否应该停止"""
-        stop_patterns = [
-            r"Final Answer:",
-            r"答案:",
-            r"结论:",
-            r"最终答案:"
-        ]
-        return any(re.search(pattern, text, re.IGNORECASE) for pattern in stop_patterns)
-    
-    def run(self, question: str) -> str:
+        # 所有停止标记合并为一个模式，一次扫描即可
+        return bool(_STOP_RE.search(text))
+    
+    async def run(self, question: str) -> str:
         """运行ReAct循环"""
         prompt_template = """你是一个智能助手，可以使用以下工具来回答问题：
 
@@ -134,7 +201,7 @@ Final Answer: [最终答案]
                 
                 # 执行工具
                 if tool_name in self.tools:
-                    observation = self.tools[tool_name].execute(tool_input)
+                    observation = await self.tools[tool_name].execute_async(tool_input)
                     observation_text = f"Observation: {observation}\n\n"
                     conversation += observation_text
                     print(observation_text)
@@ -169,7 +236,7 @@ Final Answer: [最终答案]
         else:
             return "Final Answer: 基于以上信息，我已经为您提供了答案。\n"
 
-def main():
+async def main():
     """演示用法"""
     # 创建工具
     tools = [
@@ -187,11 +254,15 @@ def main():
         "北京的人口是多少？"
     ]
     
-    for question in questions:
+    async def run_question(question: str) -> str:
         print("=" * 50)
-        result = agent.run(question)
+        result = await agent.run(question)
         print("=" * 50)
         print()
+        return result
+    
+    # 各问题的运行互不依赖，并发执行
+    await asyncio.gather(*(run_question(question) for question in questions))
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
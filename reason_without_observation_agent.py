@@ -1,9 +1,94 @@
+import io
 import re
+import sys
+import ast
 import json
+import operator
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
 
+# 模拟知识库：键同时作为关键词表，供搜索和关键词提取共用
+_KNOWLEDGE = {
+    "北京": "北京是中国的首都，人口约2100万",
+    "上海": "上海是中国最大的城市，人口约2400万",
+    "python": "Python是一种高级编程语言，广泛用于数据科学和AI",
+    "天气": "今天北京天气晴朗，温度25度",
+    "股票": "今日股市上涨2.5%，科技股表现强劲",
+    "新闻": "最新科技新闻：AI技术在各行业应用加速",
+    "react": "ReAct是一个结合推理和行动的AI框架"
+}
+_KEYWORDS = tuple(_KNOWLEDGE)
+# 所有关键词编译为一个正则，单次扫描即可：零宽前瞻在每个位置取最长命中，
+# 同一位置命中的其他关键词都是它的前缀，由 _KEYWORD_PREFIXES 补全
+_KEYWORD_RE = re.compile("(?=(" + "|".join(map(re.escape, sorted(_KEYWORDS, key=len, reverse=True))) + "))")
+# 关键词 -> 其所有前缀关键词（含自身）在 _KEYWORDS 中的下标
+_KEYWORD_PREFIXES = {
+    keyword: tuple(index for index, other in enumerate(_KEYWORDS) if keyword.startswith(other))
+    for keyword in _KEYWORDS
+}
+
+def _keyword_indices(text_lower: str) -> set:
+    """扫描文本，返回出现的全部关键词在 _KEYWORDS 中的下标"""
+    return {index for hit in _KEYWORD_RE.findall(text_lower) for index in _KEYWORD_PREFIXES[hit]}
+
+@lru_cache(maxsize=256)
+def _match_keywords(text_lower: str) -> tuple:
+    """扫描文本中出现的关键词，按 _KEYWORDS 顺序返回；批量处理时重复问题直接命中缓存"""
+    return tuple(_KEYWORDS[index] for index in sorted(_keyword_indices(text_lower)))
+
+# 路由关键词 -> 问题类别；多个类别同时命中时按 _ROUTE_PRIORITY 取优先级最高者
+_ROUTES = {
+    "计算": "math", "+": "math", "-": "math", "*": "math", "/": "math", "=": "math",
+    "搜索": "search", "什么是": "search", "介绍": "search",
+    "写入": "file", "保存": "file", "文件": "file",
+    "比较": "compare", "分析": "compare"
+}
+_ROUTE_PRIORITY = ("math", "search", "file", "compare")
+_ROUTE_RE = re.compile("|".join(map(re.escape, _ROUTES)))
+
+# 预编译的正则表达式
+_MATH_RE = re.compile(r'[\d+\-*/().\s]+')
+_NUM_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+# 删除所有合法字符的转换表：转换后非空即说明含有非法字符
+_CALC_DELETE = str.maketrans('', '', '0123456789+-*/(). \t\n\r\f\v')
+
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Pow: operator.pow
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+@lru_cache(maxsize=256)
+def _parse_expr(expr: str) -> ast.AST:
+    """解析算术表达式并按表达式缓存语法树，重复表达式无需再次解析"""
+    return ast.parse(expr.strip(), mode='eval').body
+
+def _safe_eval(node: ast.AST):
+    """递归求值算术表达式的语法树，只接受数字和算术运算，不经过 eval"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        return _BIN_OPS[type(node.op)](_safe_eval(node.left), _safe_eval(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_safe_eval(node.operand))
+    raise ValueError(f"不支持的表达式: {type(node).__name__}")
+
+def _predict_math(expr: str) -> str:
+    """生成数学表达式的预期结果描述"""
+    try:
+        return f"预期结果约为: {_safe_eval(_parse_expr(expr))}"
+    except:
+        return "预期得到数值结果"
+
 class Tool:
     """工具基类"""
+    __slots__ = ('name', 'description')
+    
     def __init__(self, name: str, description: str):
         self.name = name
         self.description = description
@@ -13,6 +98,8 @@ class Tool:
 
 class Calculator(Tool):
     """计算器工具"""
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__(
             name="calculator",
@@ -21,41 +108,37 @@ class Calculator(Tool):
     
     def execute(self, input_text: str) -> str:
         try:
-            allowed_chars = set('0123456789+-*/().')
-            if not all(c in allowed_chars or c.isspace() for c in input_text):
+            if input_text.translate(_CALC_DELETE):
                 return "错误：包含不允许的字符"
             
-            result = eval(input_text)
+            result = _safe_eval(_parse_expr(input_text))
             return str(result)
         except Exception as e:
             return f"计算错误: {str(e)}"
 
 class Search(Tool):
     """模拟搜索工具"""
+    __slots__ = ('knowledge',)
+    
     def __init__(self):
         super().__init__(
             name="search",
             description="搜索信息，输入搜索关键词"
         )
-        self.knowledge = {
-            "北京": "北京是中国的首都，人口约2100万",
-            "上海": "上海是中国最大的城市，人口约2400万",
-            "python": "Python是一种高级编程语言，广泛用于数据科学和AI",
-            "天气": "今天北京天气晴朗，温度25度",
-            "股票": "今日股市上涨2.5%，科技股表现强劲",
-            "新闻": "最新科技新闻：AI技术在各行业应用加速",
-            "react": "ReAct是一个结合推理和行动的AI框架"
-        }
+        self.knowledge = _KNOWLEDGE
     
     def execute(self, input_text: str) -> str:
         query = input_text.lower().strip()
-        for key, value in self.knowledge.items():
-            if key in query:
-                return value
+        # 包含多个关键词时按知识库顺序取第一个
+        indices = _keyword_indices(query)
+        if indices:
+            return self.knowledge[_KEYWORDS[min(indices)]]
         return f"未找到关于'{input_text}'的信息"
 
 class FileWriter(Tool):
     """文件写入工具"""
+    __slots__ = ()
+    
     def __init__(self):
         super().__init__(
             name="file_writer",
@@ -79,12 +162,32 @@ class FileWriter(Tool):
 
 class ReasoningStep:
     """推理步骤"""
+    # 固定属性集合，去掉每个实例的 __dict__
+    __slots__ = ('step_id', 'reasoning', 'action', 'tool_input', 'tool_obj',
+                 '_predicted_result', '_predicted_fn')
+    
     def __init__(self, step_id: int, reasoning: str, action: str = None, tool_input: str = None):
         self.step_id = step_id
         self.reasoning = reasoning
         self.action = action
         self.tool_input = tool_input
-        self.predicted_result = None
+        self._predicted_result = None
+        # 延迟计算预期结果的函数，首次读取 predicted_result 时才调用
+        self._predicted_fn = None
+        # 生成推理链时解析好的工具对象，执行时无需再按名称查找
+        self.tool_obj = None
+    
+    @property
+    def predicted_result(self) -> Optional[str]:
+        if self._predicted_fn is not None:
+            self._predicted_result = self._predicted_fn()
+            self._predicted_fn = None
+        return self._predicted_result
+    
+    @predicted_result.setter
+    def predicted_result(self, value: Optional[str]):
+        self._predicted_result = value
+        self._predicted_fn = None
     
     def __str__(self):
         return f"Step {self.step_id}: {self.reasoning}"
@@ -92,210 +195,245 @@ class ReasoningStep:
 class ReasonWithoutObservationAgent:
     """Reason Without Observation Agent - 先完整推理再执行"""
     
-    def __init__(self, tools: List[Tool], max_reasoning_steps: int = 5):
+    def __init__(self, tools: List[Tool], max_reasoning_steps: int = 5, quiet: bool = False):
         self.tools = {tool.name: tool for tool in tools}
+        # 工具集合构造后不再变化，描述只需拼接一次
+        self._desc_cache = "\n".join(f"- {tool.name}: {tool.description}" for tool in self.tools.values())
         self.max_reasoning_steps = max_reasoning_steps
+        # 运行日志先写入缓冲区，run 结束时一次性输出；quiet 为 True 时不输出
+        self.quiet = quiet
+        self._log = io.StringIO()
         self.reasoning_chain = []
         self.execution_results = []
+        # 问题类别 -> 推理链生成方法
+        self._chain_builders = {
+            "math": self._math_chain,
+            "search": self._search_chain,
+            "file": self._file_chain,
+            "compare": self._compare_chain,
+            "default": self._default_chain
+        }
     
     def _get_tool_descriptions(self) -> str:
         """获取工具描述"""
-        descriptions = []
-        for tool in self.tools.values():
-            descriptions.append(f"- {tool.name}: {tool.description}")
-        return "\n".join(descriptions)
+        return self._desc_cache
+    
+    def _classify_question(self, question: str) -> str:
+        """单次扫描问题，多个类别同时命中时按优先级取最高者"""
+        categories = {_ROUTES[match] for match in _ROUTE_RE.findall(question)}
+        return next((category for category in _ROUTE_PRIORITY if category in categories), "default")
     
     def _generate_reasoning_chain(self, question: str) -> List[ReasoningStep]:
         """生成完整的推理链（不执行工具）"""
+        # 分析问题类型，交给对应的推理链生成方法
+        reasoning_chain = self._chain_builders[self._classify_question(question)](question)
+        
+        # 预先绑定每个行动对应的工具
+        tools = self.tools
+        for step in reasoning_chain:
+            if step.action:
+                step.tool_obj = tools.get(step.action)
+        return reasoning_chain
+    
+    def _math_chain(self, question: str) -> List[ReasoningStep]:
+        """数学推理链"""
         reasoning_chain = []
         step_id = 1
         
-        # 分析问题并生成推理步骤
-        question_lower = question.lower()
-        
-        if "计算" in question_lower or any(op in question for op in ['+', '-', '*', '/', '=']):
-            # 数学推理链
-            math_expr = self._extract_math_expression(question)
-            if math_expr:
-                reasoning_chain.append(ReasoningStep(
-                    step_id, 
-                    f"这是一个数学计算问题，需要计算表达式: {math_expr}",
-                    "calculator",
-                    math_expr
-                ))
-                step_id += 1
-                
-                # 预测结果
-                try:
-                    predicted = eval(math_expr)
-                    reasoning_chain[-1].predicted_result = f"预期结果约为: {predicted}"
-                except:
-                    reasoning_chain[-1].predicted_result = "预期得到数值结果"
-                
-                reasoning_chain.append(ReasoningStep(
-                    step_id,
-                    f"计算完成后，我将得到 {math_expr} 的准确数值结果"
-                ))
-        
-        elif "搜索" in question_lower or "什么是" in question_lower or "介绍" in question_lower:
-            # 搜索推理链
-            keywords = self._extract_keywords(question)
-            for keyword in keywords:
-                reasoning_chain.append(ReasoningStep(
-                    step_id,
-                    f"需要搜索关于'{keyword}'的信息来回答问题",
-                    "search",
-                    keyword
-                ))
-                reasoning_chain[-1].predicted_result = f"预期获得{keyword}的详细信息"
-                step_id += 1
-            
+        math_expr = self._extract_math_expression(question)
+        if math_expr:
             reasoning_chain.append(ReasoningStep(
-                step_id,
-                "基于搜索结果，我将能够提供准确的答案"
+                step_id, 
+                f"这是一个数学计算问题，需要计算表达式: {math_expr}",
+                "calculator",
+                math_expr
             ))
-        
-        elif "写入" in question_lower or "保存" in question_lower or "文件" in question_lower:
-            # 文件操作推理链
-            reasoning_chain.append(ReasoningStep(
-                step_id,
-                "首先需要获取要写入的内容信息",
-                "search",
-                "python"
-            ))
-            reasoning_chain[-1].predicted_result = "获得相关信息内容"
             step_id += 1
             
-            reasoning_chain.append(ReasoningStep(
-                step_id,
-                "然后将获得的信息写入指定文件",
-                "file_writer",
-                "output.txt|获得的信息内容"
-            ))
-            reasoning_chain[-1].predicted_result = "成功创建文件"
-            step_id += 1
+            # 预测结果：延迟到读取时才计算，与计算器共用同一份语法树缓存
+            reasoning_chain[-1]._predicted_fn = lambda expr=math_expr: _predict_math(expr)
             
             reasoning_chain.append(ReasoningStep(
                 step_id,
-                "文件创建完成，任务执行成功"
+                f"计算完成后，我将得到 {math_expr} 的准确数值结果"
             ))
         
-        elif "比较" in question_lower or "分析" in question_lower:
-            # 比较分析推理链
-            topics = self._extract_keywords(question)
-            if len(topics) >= 2:
-                for topic in topics[:2]:  # 最多比较两个主题
-                    reasoning_chain.append(ReasoningStep(
-                        step_id,
-                        f"搜索{topic}的信息用于比较分析",
-                        "search",
-                        topic
-                    ))
-                    reasoning_chain[-1].predicted_result = f"获得{topic}的详细信息"
-                    step_id += 1
-                
-                reasoning_chain.append(ReasoningStep(
-                    step_id,
-                    f"基于收集的信息，我将能够进行{topics[0]}和{topics[1]}的比较分析"
-                ))
+        return reasoning_chain
+    
+    def _search_chain(self, question: str) -> List[ReasoningStep]:
+        """搜索推理链"""
+        reasoning_chain = []
+        step_id = 1
         
-        else:
-            # 默认推理链
+        keywords = self._extract_keywords(question)
+        for keyword in keywords:
             reasoning_chain.append(ReasoningStep(
                 step_id,
-                "分析问题，确定需要搜索相关信息",
+                f"需要搜索关于'{keyword}'的信息来回答问题",
                 "search",
-                question[:20]  # 使用问题前20个字符作为搜索词
+                keyword
             ))
-            reasoning_chain[-1].predicted_result = "获得相关信息"
+            reasoning_chain[-1].predicted_result = f"预期获得{keyword}的详细信息"
             step_id += 1
+        
+        reasoning_chain.append(ReasoningStep(
+            step_id,
+            "基于搜索结果，我将能够提供准确的答案"
+        ))
+        return reasoning_chain
+    
+    def _file_chain(self, question: str) -> List[ReasoningStep]:
+        """文件操作推理链"""
+        reasoning_chain = []
+        step_id = 1
+        
+        reasoning_chain.append(ReasoningStep(
+            step_id,
+            "首先需要获取要写入的内容信息",
+            "search",
+            "python"
+        ))
+        reasoning_chain[-1].predicted_result = "获得相关信息内容"
+        step_id += 1
+        
+        reasoning_chain.append(ReasoningStep(
+            step_id,
+            "然后将获得的信息写入指定文件",
+            "file_writer",
+            "output.txt|获得的信息内容"
+        ))
+        reasoning_chain[-1].predicted_result = "成功创建文件"
+        step_id += 1
+        
+        reasoning_chain.append(ReasoningStep(
+            step_id,
+            "文件创建完成，任务执行成功"
+        ))
+        return reasoning_chain
+    
+    def _compare_chain(self, question: str) -> List[ReasoningStep]:
+        """比较分析推理链"""
+        reasoning_chain = []
+        step_id = 1
+        
+        topics = self._extract_keywords(question)
+        if len(topics) >= 2:
+            for topic in topics[:2]:  # 最多比较两个主题
+                reasoning_chain.append(ReasoningStep(
+                    step_id,
+                    f"搜索{topic}的信息用于比较分析",
+                    "search",
+                    topic
+                ))
+                reasoning_chain[-1].predicted_result = f"获得{topic}的详细信息"
+                step_id += 1
             
             reasoning_chain.append(ReasoningStep(
                 step_id,
-                "基于搜索结果提供答案"
+                f"基于收集的信息，我将能够进行{topics[0]}和{topics[1]}的比较分析"
             ))
         
         return reasoning_chain
     
+    def _default_chain(self, question: str) -> List[ReasoningStep]:
+        """默认推理链"""
+        reasoning_chain = []
+        step_id = 1
+        
+        reasoning_chain.append(ReasoningStep(
+            step_id,
+            "分析问题，确定需要搜索相关信息",
+            "search",
+            question[:20]  # 使用问题前20个字符作为搜索词
+        ))
+        reasoning_chain[-1].predicted_result = "获得相关信息"
+        step_id += 1
+        
+        reasoning_chain.append(ReasoningStep(
+            step_id,
+            "基于搜索结果提供答案"
+        ))
+        return reasoning_chain
+    
     def _extract_math_expression(self, text: str) -> str:
         """提取数学表达式"""
-        pattern = r'[\d+\-*/().\s]+'
-        matches = re.findall(pattern, text)
-        if matches:
-            return max(matches, key=len).strip()
-        return ""
+        # 流式保留最长匹配，无需先构建全部匹配列表
+        best = ""
+        for match in _MATH_RE.finditer(text):
+            candidate = match.group(0)
+            if len(candidate) > len(best):
+                best = candidate
+        return best.strip()
     
     def _extract_keywords(self, text: str) -> List[str]:
         """提取关键词"""
-        keywords = ["北京", "上海", "python", "天气", "股票", "新闻", "react"]
-        found_keywords = []
-        text_lower = text.lower()
-        for keyword in keywords:
-            if keyword in text_lower:
-                found_keywords.append(keyword)
-        return found_keywords if found_keywords else ["信息"]
+        found_keywords = _match_keywords(text.lower())
+        return list(found_keywords) if found_keywords else ["信息"]
     
     def _execute_reasoning_chain(self) -> List[str]:
         """执行推理链中的所有行动"""
         results = []
-        collected_info = {}
+        collected_parts = []
         
         for step in self.reasoning_chain:
-            if step.action and step.action in self.tools:
-                tool = self.tools[step.action]
+            tool = step.tool_obj
+            if tool is not None:
+                action = step.action
                 
                 # 动态调整工具输入
                 tool_input = step.tool_input
-                if step.action == "file_writer" and "|" in tool_input:
+                if action == "file_writer" and "|" in tool_input:
                     filename, content_template = tool_input.split('|', 1)
                     if "获得的信息内容" in content_template:
                         # 使用之前收集的信息
-                        content = "\n".join(collected_info.values()) if collected_info else "默认内容"
+                        content = "\n".join(collected_parts) or "默认内容"
                         tool_input = f"{filename}|{content}"
                 
                 result = tool.execute(tool_input)
                 results.append(result)
                 
                 # 收集信息用于后续步骤
-                if step.action == "search":
-                    collected_info[step.tool_input] = result
+                if action == "search":
+                    collected_parts.append(result)
                 
-                print(f"执行 {step.action}[{tool_input}] -> {result}")
+                self._log.write(f"执行 {action}[{tool_input}] -> {result}\n")
         
         return results
     
     def run(self, question: str) -> str:
         """运行Reason Without Observation循环"""
-        print(f"问题: {question}\n")
+        self._log = log = io.StringIO()
+        log.write(f"问题: {question}\n\n")
         
         # 阶段1: 完整推理（不执行工具）
-        print("=== 推理阶段 ===")
+        log.write("=== 推理阶段 ===\n")
         self.reasoning_chain = self._generate_reasoning_chain(question)
         
-        print("推理链:")
+        log.write("推理链:\n")
         for step in self.reasoning_chain:
-            print(f"  {step}")
+            log.write(f"  {step}\n")
             if step.predicted_result:
-                print(f"    预期: {step.predicted_result}")
+                log.write(f"    预期: {step.predicted_result}\n")
             if step.action:
-                print(f"    行动: {step.action}[{step.tool_input}]")
-        print()
+                log.write(f"    行动: {step.action}[{step.tool_input}]\n")
+        log.write("\n")
         
         # 阶段2: 执行所有行动
-        print("=== 执行阶段 ===")
+        log.write("=== 执行阶段 ===\n")
         self.execution_results = self._execute_reasoning_chain()
-        print()
+        log.write("\n")
         
         # 阶段3: 生成最终答案
-        print("=== 结果阶段 ===")
+        log.write("=== 结果阶段 ===\n")
         if self.execution_results:
             final_answer = self._generate_final_answer(question, self.execution_results)
-            print(f"最终答案: {final_answer}")
-            return final_answer
         else:
             final_answer = "基于推理分析，已完成问题处理"
-            print(f"最终答案: {final_answer}")
-            return final_answer
+        log.write(f"最终答案: {final_answer}\n")
+        
+        if not self.quiet:
+            sys.stdout.write(log.getvalue())
+        return final_answer
     
     def _generate_final_answer(self, question: str, results: List[str]) -> str:
         """基于执行结果生成最终答案"""
@@ -307,9 +445,9 @@ class ReasonWithoutObservationAgent:
         
         if "计算" in question_lower:
             # 数学计算结果
-            for result in results:
-                if result.replace('.', '').replace('-', '').isdigit():
-                    return f"计算结果是: {result}"
+            number = next((result for result in results if _NUM_RE.fullmatch(result)), None)
+            if number is not None:
+                return f"计算结果是: {number}"
             return f"计算完成: {results[-1]}"
         
         elif "什么是" in question_lower or "介绍" in question_lower:
@@ -1,10 +1,133 @@
 import json
 import re
+from types import MappingProxyType
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Dict, List, Any, Optional, Tuple
 from enum import Enum
 
+# 最终答案的任务类别关键词（子串匹配）；多个类别同时命中时按定义顺序取第一个
+_CATEGORY_KEYWORDS = {
+    "math": ("math", "calculate"),
+    "decision": ("decision", "choose"),
+    "creative": ("creative", "design")
+}
+_KEYWORD_CATEGORY = {keyword: category for category, keywords in _CATEGORY_KEYWORDS.items() for keyword in keywords}
+# 零宽前瞻使重叠的关键词也能命中，一次扫描得到全部类别
+_CATEGORY_RE = re.compile(
+    "(?=(" + "|".join(map(re.escape, sorted(_KEYWORD_CATEGORY, key=len, reverse=True))) + "))"
+)
+_CATEGORY_ANSWERS = {
+    "math": "Based on systematic analysis, the mathematical solution involves breaking down the problem into steps and applying appropriate formulas.",
+    "decision": "After comparative analysis and critical evaluation, the recommended decision is based on weighing pros and cons of available options.",
+    "creative": "Through creative thinking and systematic analysis, multiple innovative approaches have been identified and can be combined for an optimal solution."
+}
+
+# 各推理模块适配到任务时的具体行动步骤
+_ADAPT_ACTIONS = MappingProxyType({
+    "Critical Thinking": (
+        "Identify key assumptions in the task",
+        "Question the validity of given information",
+        "Evaluate evidence and sources",
+        "Consider alternative perspectives"
+    ),
+    "Step-by-Step Reasoning": (
+        "Break down the task into smaller sub-problems",
+        "Identify the logical sequence of steps",
+        "Solve each step systematically",
+        "Verify each step before proceeding"
+    ),
+    "Creative Thinking": (
+        "Brainstorm multiple approaches",
+        "Think outside conventional boundaries",
+        "Generate novel combinations of ideas",
+        "Explore unconventional solutions"
+    ),
+    "Comparative Analysis": (
+        "Identify different options or approaches",
+        "List pros and cons of each option",
+        "Compare based on relevant criteria",
+        "Select the best option with justification"
+    ),
+    "Causal Reasoning": (
+        "Identify potential causes",
+        "Trace cause-and-effect chains",
+        "Analyze contributing factors",
+        "Predict consequences of actions"
+    )
+})
+
+def _generic_actions(module_name: str) -> Tuple[str, ...]:
+    """未单独定义行动步骤的模块使用的通用适配"""
+    return (
+        f"Apply {module_name} principles",
+        "Analyze the problem systematically",
+        "Generate insights using this approach",
+        "Integrate findings with other approaches"
+    )
+
+def _frozen_result(insights: Tuple[str, ...], analysis: Dict[str, Any]) -> MappingProxyType:
+    """构造只读的模拟执行结果模板，只在本模块内部共享"""
+    return MappingProxyType({
+        'insights': insights,
+        'analysis': MappingProxyType(analysis),
+        'recommendations': ()
+    })
+
+# 各推理模块的模拟执行结果模板：各层都是只读的（元组和 MappingProxyType）
+_EXEC_RESULTS = MappingProxyType({
+    "Critical Thinking": _frozen_result(
+        (
+            "Identified key assumptions that need validation",
+            "Found potential biases in the problem statement",
+            "Evaluated the reliability of given information"
+        ),
+        {'assumptions': ("Assumption 1", "Assumption 2"), 'evidence_quality': "Medium"}
+    ),
+    "Step-by-Step Reasoning": _frozen_result(
+        (
+            "Broke down the problem into manageable steps",
+            "Identified logical dependencies between steps",
+            "Created a systematic approach to solution"
+        ),
+        {'steps': ("Step 1", "Step 2", "Step 3"), 'complexity': "Moderate"}
+    ),
+    "Creative Thinking": _frozen_result(
+        (
+            "Generated multiple alternative approaches",
+            "Identified unconventional solution paths",
+            "Explored creative combinations of existing ideas"
+        ),
+        {'alternatives': ("Alternative 1", "Alternative 2"), 'novelty_score': 0.7}
+    ),
+    "Comparative Analysis": _frozen_result(
+        (
+            "Compared different solution approaches",
+            "Identified trade-offs between options",
+            "Ranked solutions based on criteria"
+        ),
+        {'options': ("Option A", "Option B"), 'best_option': "Option A"}
+    )
+})
+
+def _copy_result(template: MappingProxyType) -> Dict[str, Any]:
+    """把只读模板复制成普通的 dict/list，交给调用方修改或序列化"""
+    return {
+        'insights': list(template['insights']),
+        'analysis': {
+            key: list(value) if isinstance(value, tuple) else value
+            for key, value in template['analysis'].items()
+        },
+        'recommendations': list(template['recommendations'])
+    }
+
+def _default_result(module_name: str) -> MappingProxyType:
+    """未单独定义结果模板的模块使用的通用结果"""
+    return _frozen_result(
+        (f"Applied {module_name} to analyze the problem",),
+        {'general_findings': "Various insights generated"}
+    )
+
 class ReasoningModule:
     """推理模块基类"""
     def __init__(self, name: str, description: str, pattern: str, applicable_domains: List[str]):
@@ -12,20 +135,33 @@ class ReasoningModule:
         self.description = description
         self.pattern = pattern  # 推理模式的描述
         self.applicable_domains = applicable_domains
+        # 由模块库分配的整数编号，内部查表都用它，名称只用于展示；未注册的模块为 None
+        self.id: Optional[int] = None
+        # 关键词和领域集合在构造后不变，预先计算
+        self._keywords = tuple(pattern.lower().split())
+        self._domains = frozenset(applicable_domains)
+        # 关键词按 UTF-8 字节匹配：字节串查找不受 str 内部宽度（1/2/4字节）影响
+        self._kw_bytes = tuple(keyword.encode() for keyword in self._keywords)
+        # 本模块全部关键词编译成一个正则，判断时只需一次扫描
+        # 没有关键词时不编译：空正则会匹配任意文本
+        self._keyword_re = re.compile(b"|".join(map(re.escape, self._kw_bytes))) if self._kw_bytes else None
+    
+    def matches_domain(self, domain: str) -> bool:
+        """判断领域是否匹配"""
+        return domain in self._domains or "general" in self._domains
     
-    def is_applicable(self, task: str, domain: str = "general") -> bool:
-        """判断该推理模块是否适用于给定任务"""
+    def is_applicable(self, task: str, domain: str = "general", task_lower: Optional[str] = None) -> bool:
+        """判断该推理模块是否适用于给定任务；task_lower 为调用方已转小写的任务文本"""
         # 简单的关键词匹配
-        keywords = self.pattern.lower().split()
-        task_lower = task.lower()
+        if task_lower is None:
+            task_lower = task.lower()
         
         # 检查领域匹配
-        domain_match = domain in self.applicable_domains or "general" in self.applicable_domains
+        domain_match = self.matches_domain(domain)
         
         # 检查关键词匹配
-        keyword_match = any(keyword in task_lower for keyword in keywords)
-        
-        return domain_match and keyword_match
+        return (domain_match and self._keyword_re is not None
+                and self._keyword_re.search(task_lower.encode()) is not None)
     
     def __str__(self):
         return f"{self.name}: {self.description}"
@@ -34,6 +170,44 @@ class ReasoningModuleLibrary:
     """推理模块库"""
     def __init__(self):
         self.modules = self._initialize_modules()
+        for index, module in enumerate(self.modules):
+            module.id = index
+        self._by_name = {module.name: module for module in self.modules}
+        # 按模块编号索引的行动步骤和执行结果模板
+        self._actions_by_id = tuple(
+            _ADAPT_ACTIONS.get(module.name) or _generic_actions(module.name) for module in self.modules
+        )
+        self._results_by_id = tuple(
+            _EXEC_RESULTS.get(module.name) or _default_result(module.name) for module in self.modules
+        )
+        self._build_keyword_matcher()
+    
+    def _build_keyword_matcher(self):
+        """把所有模块的关键词合并为一个正则，单次扫描任务文本即可判定全部模块"""
+        # 模块集合用整数位集表示：第 i 位对应 self.modules[i]
+        keyword_masks: Dict[bytes, int] = {}
+        self._domain_masks: Dict[str, int] = {}
+        self._general_mask = 0
+        for index, module in enumerate(self.modules):
+            bit = 1 << index
+            for keyword in module._kw_bytes:
+                keyword_masks[keyword] = keyword_masks.get(keyword, 0) | bit
+            for domain in module._domains:
+                self._domain_masks[domain] = self._domain_masks.get(domain, 0) | bit
+            if "general" in module._domains:
+                self._general_mask |= bit
+        
+        # 同一位置命中的关键词都是该位置最长命中关键词的前缀，预先合并这些前缀关键词的位集
+        self._keyword_masks: Dict[bytes, int] = {}
+        for keyword in keyword_masks:
+            mask = 0
+            for other, other_mask in keyword_masks.items():
+                if keyword.startswith(other):
+                    mask |= other_mask
+            self._keyword_masks[keyword] = mask
+        # 零宽前瞻使每个位置都参与匹配，重叠的关键词也不会漏掉；长关键词优先
+        alternation = b"|".join(map(re.escape, sorted(keyword_masks, key=len, reverse=True)))
+        self._keyword_re = re.compile(b"(?=(" + alternation + b"))")
     
     def _initialize_modules(self) -> List[ReasoningModule]:
         """初始化推理模块库"""
@@ -88,13 +262,32 @@ class ReasoningModuleLibrary:
             )
         ]
     
+    def get(self, name: str) -> Optional[ReasoningModule]:
+        """按名称获取推理模块"""
+        return self._by_name.get(name)
+    
+    def get_actions(self, module_id: int) -> Tuple[str, ...]:
+        """按模块编号获取适配后的行动步骤"""
+        return self._actions_by_id[module_id]
+    
+    def get_result_template(self, module_id: int) -> MappingProxyType:
+        """按模块编号获取模拟执行结果模板（共享的只读对象）"""
+        return self._results_by_id[module_id]
+    
     def get_all_modules(self) -> List[ReasoningModule]:
         """获取所有推理模块"""
         return self.modules
     
     def find_applicable_modules(self, task: str, domain: str = "general") -> List[ReasoningModule]:
         """找到适用于给定任务的推理模块"""
-        return [module for module in self.modules if module.is_applicable(task, domain)]
+        hits = 0
+        # 任务文本只转小写、编码一次
+        for keyword in self._keyword_re.findall(task.lower().encode()):
+            hits |= self._keyword_masks[keyword]
+        # 领域匹配：领域包含该 domain 或包含 general 的模块
+        hits &= self._domain_masks.get(domain, 0) | self._general_mask
+        
+        return [module for index, module in enumerate(self.modules) if hits >> index & 1]
 
 @dataclass
 class ReasoningStructure:
@@ -145,10 +338,9 @@ class SelfDiscoverAgent:
         
         # 如果没有找到适用的模块，选择一些通用模块
         if not selected_modules:
-            all_modules = self.module_library.get_all_modules()
             selected_modules = [
-                next(m for m in all_modules if m.name == "Critical Thinking"),
-                next(m for m in all_modules if m.name == "Step-by-Step Reasoning")
+                self.module_library.get("Critical Thinking"),
+                self.module_library.get("Step-by-Step Reasoning")
             ]
         
         print("Selected modules:")
@@ -185,58 +377,19 @@ class SelfDiscoverAgent:
     
     def _adapt_single_module(self, module: ReasoningModule, task: str) -> Dict[str, Any]:
         """适配单个推理模块"""
-        adapted_component = {
+        # 根据模块编号取出具体的行动步骤
+        if module.id is None:
+            # 未在模块库中注册的模块没有编号，按名称查表，查不到时使用通用适配
+            actions = _ADAPT_ACTIONS.get(module.name) or _generic_actions(module.name)
+        else:
+            actions = self.module_library.get_actions(module.id)
+        
+        return {
+            'module_id': module.id,
             'original_module': module.name,
             'description': f"Apply {module.name} to: {task}",
-            'specific_actions': []
+            'specific_actions': list(actions)
         }
-        
-        # 根据模块类型生成具体的行动步骤
-        if module.name == "Critical Thinking":
-            adapted_component['specific_actions'] = [
-                "Identify key assumptions in the task",
-                "Question the validity of given information",
-                "Evaluate evidence and sources",
-                "Consider alternative perspectives"
-            ]
-        elif module.name == "Step-by-Step Reasoning":
-            adapted_component['specific_actions'] = [
-                "Break down the task into smaller sub-problems",
-                "Identify the logical sequence of steps",
-                "Solve each step systematically",
-                "Verify each step before proceeding"
-            ]
-        elif module.name == "Creative Thinking":
-            adapted_component['specific_actions'] = [
-                "Brainstorm multiple approaches",
-                "Think outside conventional boundaries",
-                "Generate novel combinations of ideas",
-                "Explore unconventional solutions"
-            ]
-        elif module.name == "Comparative Analysis":
-            adapted_component['specific_actions'] = [
-                "Identify different options or approaches",
-                "List pros and cons of each option",
-                "Compare based on relevant criteria",
-                "Select the best option with justification"
-            ]
-        elif module.name == "Causal Reasoning":
-            adapted_component['specific_actions'] = [
-                "Identify potential causes",
-                "Trace cause-and-effect chains",
-                "Analyze contributing factors",
-                "Predict consequences of actions"
-            ]
-        else:
-            # 通用适配
-            adapted_component['specific_actions'] = [
-                f"Apply {module.name} principles",
-                "Analyze the problem systematically",
-                "Generate insights using this approach",
-                "Integrate findings with other approaches"
-            ]
-        
-        return adapted_component
     
     def _implement_reasoning(self, adapted_structure: Dict[str, Any], task: str) -> Dict[str, Any]:
         """Stage 3: IMPLEMENT - 实现推理结构解决问题"""
@@ -278,57 +431,15 @@ class SelfDiscoverAgent:
     
     def _execute_reasoning_component(self, component: Dict[str, Any], task: str) -> Dict[str, Any]:
         """执行单个推理组件"""
-        module_name = component['original_module']
-        actions = component['specific_actions']
-        
-        result = {
-            'insights': [],
-            'analysis': {},
-            'recommendations': []
-        }
-        
         # 模拟推理过程（在实际实现中，这里会有更复杂的推理逻辑）
-        if module_name == "Critical Thinking":
-            result['insights'] = [
-                "Identified key assumptions that need validation",
-                "Found potential biases in the problem statement",
-                "Evaluated the reliability of given information"
-            ]
-            result['analysis']['assumptions'] = ["Assumption 1", "Assumption 2"]
-            result['analysis']['evidence_quality'] = "Medium"
-            
-        elif module_name == "Step-by-Step Reasoning":
-            result['insights'] = [
-                "Broke down the problem into manageable steps",
-                "Identified logical dependencies between steps",
-                "Created a systematic approach to solution"
-            ]
-            result['analysis']['steps'] = ["Step 1", "Step 2", "Step 3"]
-            result['analysis']['complexity'] = "Moderate"
-            
-        elif module_name == "Creative Thinking":
-            result['insights'] = [
-                "Generated multiple alternative approaches",
-                "Identified unconventional solution paths",
-                "Explored creative combinations of existing ideas"
-            ]
-            result['analysis']['alternatives'] = ["Alternative 1", "Alternative 2"]
-            result['analysis']['novelty_score'] = 0.7
-            
-        elif module_name == "Comparative Analysis":
-            result['insights'] = [
-                "Compared different solution approaches",
-                "Identified trade-offs between options",
-                "Ranked solutions based on criteria"
-            ]
-            result['analysis']['options'] = ["Option A", "Option B"]
-            result['analysis']['best_option'] = "Option A"
-            
+        module_id = component['module_id']
+        if module_id is None:
+            module_name = component['original_module']
+            template = _EXEC_RESULTS.get(module_name) or _default_result(module_name)
         else:
-            result['insights'] = [f"Applied {module_name} to analyze the problem"]
-            result['analysis']['general_findings'] = "Various insights generated"
-        
-        return result
+            template = self.module_library.get_result_template(module_id)
+        # 模板是共享的只读对象，交给调用方的是普通 dict/list 副本
+        return _copy_result(template)
     
     def _synthesize_final_answer(self, reasoning_steps: List[Dict[str, Any]], task: str) -> str:
         """综合所有推理步骤得出最终答案"""
@@ -338,25 +449,22 @@ class SelfDiscoverAgent:
             all_insights.extend(step['result'].get('insights', []))
         
         # 简单的答案合成（在实际实现中会更复杂）
-        if "math" in task.lower() or "calculate" in task.lower():
-            return "Based on systematic analysis, the mathematical solution involves breaking down the problem into steps and applying appropriate formulas."
-        elif "decision" in task.lower() or "choose" in task.lower():
-            return "After comparative analysis and critical evaluation, the recommended decision is based on weighing pros and cons of available options."
-        elif "creative" in task.lower() or "design" in task.lower():
-            return "Through creative thinking and systematic analysis, multiple innovative approaches have been identified and can be combined for an optimal solution."
-        else:
-            return f"Based on multi-faceted reasoning analysis, the solution involves integrating insights from {len(reasoning_steps)} different reasoning approaches."
+        categories = {_KEYWORD_CATEGORY[keyword] for keyword in _CATEGORY_RE.findall(task.lower())}
+        for category in _CATEGORY_KEYWORDS:
+            if category in categories:
+                return _CATEGORY_ANSWERS[category]
+        return f"Based on multi-faceted reasoning analysis, the solution involves integrating insights from {len(reasoning_steps)} different reasoning approaches."
     
     def _calculate_confidence(self, reasoning_steps: List[Dict[str, Any]]) -> float:
         """计算解决方案的置信度"""
         # 简单的置信度计算：基于使用的推理模块数量和质量
         base_confidence = min(0.9, 0.3 + 0.2 * len(reasoning_steps))
         
-        # 根据推理质量调整
-        quality_bonus = 0.0
-        for step in reasoning_steps:
-            insights_count = len(step['result'].get('insights', []))
-            quality_bonus += min(0.1, insights_count * 0.02)
+        # 根据推理质量调整：单次生成器求和，不构造中间列表
+        quality_bonus = sum(
+            min(0.1, len(step['result'].get('insights', ())) * 0.02)
+            for step in reasoning_steps
+        )
         
         return min(1.0, base_confidence + quality_bonus)
     
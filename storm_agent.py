@@ -1,42 +1,123 @@
+import os
+import math
 import time
+import asyncio
 import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from abc import ABC, abstractmethod
-from queue import Queue
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
+
+# 已生成的斐波那契数列，按需向后扩展。缓存是进程内的：MathAgent 在进程池中运行时
+# 每个工作进程各有一份；同一进程内仍可能被多个线程并发调用，扩展时加锁
+_FIB_CACHE = [0, 1]
+_FIB_LOCK = threading.Lock()
+
+def _fibonacci(n: int) -> List[int]:
+    """生成斐波那契数列"""
+    if n <= 0:
+        return []
+    
+    if len(_FIB_CACHE) < n:
+        with _FIB_LOCK:
+            missing = n - len(_FIB_CACHE)
+            if missing > 0:
+                # 新增部分先在预分配的列表中按下标填好，再一次性追加，
+                # 锁外的读取方不会看到未填充的元素
+                grown = [0] * missing
+                a, b = _FIB_CACHE[-2], _FIB_CACHE[-1]
+                for i in range(missing):
+                    a, b = b, a + b
+                    grown[i] = b
+                _FIB_CACHE.extend(grown)
+    return _FIB_CACHE[:n]
+
+def _is_prime(num: int) -> bool:
+    """检查是否为质数"""
+    if num < 4:
+        return num >= 2
+    if num % 2 == 0 or num % 3 == 0:
+        return False
+    # 大于3的质数都形如 6k±1，只需试除这些数；整数用 isqrt 求精确平方根，
+    # 浮点数（如 17.0）isqrt 不接受，沿用开方取整
+    limit = math.isqrt(num) if isinstance(num, int) else int(num ** 0.5)
+    for i in range(5, limit + 1, 6):
+        if num % i == 0 or num % (i + 2) == 0:
+            return False
+    return True
+
+# 停止信号：放入任务队列后工作循环立即退出
+_SHUTDOWN = object()
+
+class _Task:
+    """任务信封：固定三个字段，用 __slots__ 代替字典"""
+    __slots__ = ('data', 'callback', 'skill')
+    
+    def __init__(self, data: Any, callback, skill: Optional[str]):
+        self.data = data
+        self.callback = callback
+        self.skill = skill
 
 class Agent(ABC):
     """Agent基类"""
     
+    # 任务类型：'inline' 为短小的内存计算，直接在事件循环中执行；
+    # 'io' 为阻塞型任务，交给线程池；'cpu' 为耗时计算，交给进程池并行执行
+    kind = 'inline'
+    
     def __init__(self, name: str, skills: List[str]):
         self.name = name
         self.skills = skills
-        self.task_queue = Queue()
+        self.task_queue = asyncio.Queue()
         self.is_running = False
-        self.thread = None
+        # 由协调器按 kind 分配；为 None 时在事件循环中直接执行
+        self.executor: Optional[Executor] = None
     
     def start(self):
         """启动Agent"""
         self.is_running = True
-        self.thread = threading.Thread(target=self._work_loop)
-        self.thread.start()
         print(f"Agent {self.name} started")
     
     def stop(self):
-        """停止Agent"""
+        """停止Agent：处理完已提交的任务后退出工作循环"""
         self.is_running = False
-        if self.thread:
-            self.thread.join()
-    
-    def _work_loop(self):
-        """工作循环"""
-        while self.is_running:
-            try:
-                task = self.task_queue.get(timeout=0.1)
-                result = self.process(task['data'])
-                if task['callback']:
-                    task['callback'](result)
-            except:
-                continue
+        self.enqueue_batch([_Task(_SHUTDOWN, None, None)])
+    
+    def enqueue_batch(self, tasks: List[_Task]):
+        """提交一批任务：整批只占一个队列元素，只唤醒一次工作循环"""
+        self.task_queue.put_nowait(tasks)
+    
+    async def run(self):
+        """工作循环，所有Agent在同一个事件循环中协作运行"""
+        loop = asyncio.get_running_loop()
+        while True:
+            # 等待任务，空闲时不占用CPU
+            batch = await self.task_queue.get()
+            tasks = [task for task in batch if task.data is not _SHUTDOWN]
+            if self.executor is None:
+                for task in tasks:
+                    try:
+                        self._complete(task, self.process(task.data))
+                    except Exception:
+                        continue
+            else:
+                # 同一批任务同时提交给执行器，使进程池/线程池的多个工作者并行处理
+                await asyncio.gather(*(self._run_in_executor(loop, task) for task in tasks))
+            if len(tasks) < len(batch):
+                return
+    
+    async def _run_in_executor(self, loop: asyncio.AbstractEventLoop, task: _Task):
+        """在执行器中处理单个任务，出错不影响同批其他任务"""
+        try:
+            result = await loop.run_in_executor(self.executor, self.process, task.data)
+            self._complete(task, result)
+        except Exception:
+            pass
+    
+    def _complete(self, task: _Task, result: Any):
+        """通过回调上报任务结果"""
+        if task.callback:
+            task.callback(self.name, task.skill, result)
     
     @abstractmethod
     def process(self, data: Any) -> Any:
@@ -59,10 +140,13 @@ class DataAgent(Agent):
         values = data.get('values', [])
         
         if task_type == 'analyze':
+            # 只遍历一次求和，平均值复用该结果
+            count = len(values)
+            total = sum(values)
             return {
-                'count': len(values),
-                'sum': sum(values) if values else 0,
-                'avg': sum(values) / len(values) if values else 0
+                'count': count,
+                'sum': total,
+                'avg': total / count if count else 0
             }
         
         elif task_type == 'filter':
@@ -77,130 +161,147 @@ class DataAgent(Agent):
         
         return {'error': 'Unknown task type'}
 
+def _process_math(data: Dict[str, Any]) -> Dict[str, Any]:
+    """处理数学任务；定义为顶层函数，可以被序列化后交给进程池执行"""
+    task_type = data.get('type')
+    
+    if task_type == 'fibonacci':
+        n = data.get('n', 10)
+        fib = _fibonacci(n)
+        return {'fibonacci': fib, 'length': len(fib)}
+    
+    elif task_type == 'prime':
+        num = data.get('number', 2)
+        is_prime = _is_prime(num)
+        return {'number': num, 'is_prime': is_prime}
+    
+    elif task_type == 'calculate':
+        a = data.get('a', 0)
+        b = data.get('b', 0)
+        op = data.get('operation', 'add')
+        
+        if op == 'add':
+            result = a + b
+        elif op == 'multiply':
+            result = a * b
+        elif op == 'power':
+            result = a ** b
+        else:
+            result = 0
+        
+        return {'result': result, 'operation': f"{a} {op} {b}"}
+    
+    return {'error': 'Unknown task type'}
+
 class MathAgent(Agent):
     """数学计算Agent"""
     
+    # 大数质数判断、长斐波那契数列是纯CPU计算，交给进程池绕开GIL
+    kind = 'cpu'
+    
     def __init__(self):
         super().__init__("MathAgent", ["calculate", "fibonacci", "prime"])
     
-    def process(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """处理数学任务"""
-        task_type = data.get('type')
-        
-        if task_type == 'fibonacci':
-            n = data.get('n', 10)
-            fib = self._fibonacci(n)
-            return {'fibonacci': fib, 'length': len(fib)}
-        
-        elif task_type == 'prime':
-            num = data.get('number', 2)
-            is_prime = self._is_prime(num)
-            return {'number': num, 'is_prime': is_prime}
-        
-        elif task_type == 'calculate':
-            a = data.get('a', 0)
-            b = data.get('b', 0)
-            op = data.get('operation', 'add')
-            
-            if op == 'add':
-                result = a + b
-            elif op == 'multiply':
-                result = a * b
-            elif op == 'power':
-                result = a ** b
-            else:
-                result = 0
-            
-            return {'result': result, 'operation': f"{a} {op} {b}"}
-        
-        return {'error': 'Unknown task type'}
-    
-    def _fibonacci(self, n: int) -> List[int]:
-        """生成斐波那契数列"""
-        if n <= 0:
-            return []
-        elif n == 1:
-            return [0]
-        
-        fib = [0, 1]
-        for i in range(2, n):
-            fib.append(fib[i-1] + fib[i-2])
-        return fib
-    
-    def _is_prime(self, num: int) -> bool:
-        """检查是否为质数"""
-        if num < 2:
-            return False
-        for i in range(2, int(num ** 0.5) + 1):
-            if num % i == 0:
-                return False
-        return True
+    # 进程池只能执行可序列化的顶层函数，process 直接指向它
+    process = staticmethod(_process_math)
 
 class StormCoordinator:
     """Storm协调器 - 最小化实现"""
     
     def __init__(self):
         self.agents: List[Agent] = []
-        self.results: List[Any] = []
+        # 结果由各Agent通过 _record_result 追加
+        self.results: deque = deque()
+        # 技能 -> Agent 的索引，先注册的 Agent 优先
+        self._skill_index: Dict[str, Agent] = {}
+        self._runner: Optional[asyncio.Future] = None
+        self._executors: List[Executor] = []
     
     def add_agent(self, agent: Agent):
         """添加Agent"""
         self.agents.append(agent)
+        for skill in agent.skills:
+            self._skill_index.setdefault(skill, agent)
         print(f"Added {agent.name} with skills: {agent.skills}")
     
     def start_all(self):
-        """启动所有Agent"""
+        """启动所有Agent，需在事件循环中调用"""
+        # CPU密集型Agent使用进程池并行计算，IO型Agent使用线程池，inline 型不需要执行器
+        kinds = {agent.kind for agent in self.agents}
+        pools: Dict[str, Executor] = {}
+        if 'cpu' in kinds:
+            pools['cpu'] = ProcessPoolExecutor(max_workers=os.cpu_count())
+        if 'io' in kinds:
+            pools['io'] = ThreadPoolExecutor()
+        self._executors = list(pools.values())
+        
         for agent in self.agents:
+            agent.executor = pools.get(agent.kind)
             agent.start()
+        self._runner = asyncio.gather(*(agent.run() for agent in self.agents))
         print("All agents started")
     
-    def stop_all(self):
+    async def stop_all(self):
         """停止所有Agent"""
         for agent in self.agents:
             agent.stop()
+        if self._runner:
+            await self._runner
+            self._runner = None
+        # 关闭进程池会等待工作进程退出，放到线程中执行，不阻塞事件循环
+        await asyncio.gather(*(asyncio.to_thread(executor.shutdown) for executor in self._executors))
+        self._executors = []
         print("All agents stopped")
     
     def submit_task(self, skill: str, data: Dict[str, Any]) -> bool:
         """提交任务"""
-        # 找到能处理该技能的Agent
-        suitable_agent = self._find_agent(skill)
-        
-        if suitable_agent:
-            # 创建回调函数来收集结果
-            def callback(result):
-                self.results.append({
-                    'agent': suitable_agent.name,
-                    'skill': skill,
-                    'result': result,
-                    'timestamp': time.time()
-                })
-                print(f"Task completed by {suitable_agent.name}: {result}")
+        return self.submit_tasks([(skill, data)])[0]
+    
+    def submit_tasks(self, tasks: List[Tuple[str, Dict[str, Any]]]) -> List[bool]:
+        """批量提交任务：按目标Agent分组，每个Agent只入队一次；返回每个任务是否提交成功"""
+        batches: Dict[Agent, List[_Task]] = {}
+        submitted = []
+        # 所有任务共用同一个结果回调，不再为每个任务创建闭包
+        record = self._record_result
+        for skill, data in tasks:
+            # 找到能处理该技能的Agent
+            suitable_agent = self._find_agent(skill)
+            if suitable_agent is None:
+                print(f"No agent found for skill: {skill}")
+                submitted.append(False)
+                continue
             
-            # 提交任务
-            task = {'data': data, 'callback': callback}
-            suitable_agent.task_queue.put(task)
+            batches.setdefault(suitable_agent, []).append(_Task(data, record, skill))
             print(f"Task submitted to {suitable_agent.name}")
-            return True
+            submitted.append(True)
         
-        print(f"No agent found for skill: {skill}")
-        return False
+        for agent, batch in batches.items():
+            agent.enqueue_batch(batch)
+        return submitted
+    
+    def _record_result(self, agent_name: str, skill: str, result: Any):
+        """收集Agent完成的任务结果"""
+        self.results.append({
+            'agent': agent_name,
+            'skill': skill,
+            'result': result,
+            'timestamp': time.time()
+        })
+        print(f"Task completed by {agent_name}: {result}")
     
     def _find_agent(self, skill: str) -> Optional[Agent]:
         """找到能处理指定技能的Agent"""
-        for agent in self.agents:
-            if agent.can_handle(skill):
-                return agent
-        return None
+        return self._skill_index.get(skill)
     
     def get_results(self) -> List[Dict[str, Any]]:
         """获取所有结果"""
-        return self.results.copy()
+        return list(self.results)
     
     def clear_results(self):
         """清空结果"""
         self.results.clear()
 
-def demo():
+async def demo():
     """演示Storm系统"""
     print("=== Minimal Storm Agent Demo ===\n")
     
@@ -220,49 +321,41 @@ def demo():
     
     print("\n--- Submitting Tasks ---")
     
-    # 提交数据分析任务
-    coordinator.submit_task('analyze', {
-        'type': 'analyze',
-        'values': [1, 2, 3, 4, 5, 10, 15, 20]
-    })
-    
-    # 提交斐波那契计算任务
-    coordinator.submit_task('fibonacci', {
-        'type': 'fibonacci',
-        'n': 8
-    })
-    
-    # 提交数据过滤任务
-    coordinator.submit_task('filter', {
-        'type': 'filter',
-        'values': [1, 5, 10, 15, 20, 25],
-        'threshold': 10
-    })
-    
-    # 提交质数检查任务
-    coordinator.submit_task('prime', {
-        'type': 'prime',
-        'number': 17
-    })
-    
-    # 提交数学计算任务
-    coordinator.submit_task('calculate', {
-        'type': 'calculate',
-        'a': 5,
-        'b': 3,
-        'operation': 'power'
-    })
-    
-    # 提交数据转换任务
-    coordinator.submit_task('transform', {
-        'type': 'transform',
-        'values': [1, 2, 3, 4, 5],
-        'multiplier': 3
-    })
+    # 一次性批量提交：数据分析、斐波那契、数据过滤、质数检查、数学计算、数据转换
+    coordinator.submit_tasks([
+        ('analyze', {
+            'type': 'analyze',
+            'values': [1, 2, 3, 4, 5, 10, 15, 20]
+        }),
+        ('fibonacci', {
+            'type': 'fibonacci',
+            'n': 8
+        }),
+        ('filter', {
+            'type': 'filter',
+            'values': [1, 5, 10, 15, 20, 25],
+            'threshold': 10
+        }),
+        ('prime', {
+            'type': 'prime',
+            'number': 17
+        }),
+        ('calculate', {
+            'type': 'calculate',
+            'a': 5,
+            'b': 3,
+            'operation': 'power'
+        }),
+        ('transform', {
+            'type': 'transform',
+            'values': [1, 2, 3, 4, 5],
+            'multiplier': 3
+        })
+    ])
     
     # 等待任务完成
     print("\nWaiting for tasks to complete...")
-    time.sleep(2)
+    await asyncio.sleep(2)
     
     # 显示结果
     print("\n--- Results ---")
@@ -277,8 +370,8 @@ def demo():
     print(f"Total completed tasks: {len(results)}")
     
     # 停止所有Agent
-    coordinator.stop_all()
+    await coordinator.stop_all()
     print("Demo completed!")
 
 if __name__ == "__main__":
-    demo()
+    asyncio.run(demo())